@@ -0,0 +1,114 @@
+import asyncio
+import os
+import time
+from fastapi import HTTPException, Request, status
+
+from api.api_key_auth import verify_api_key
+from core.admission import search_latency
+from core.profiling import stage
+
+# Per-route defaults; override with ADMISSION_<ROUTE>_MAX_CONCURRENCY / _MAX_QUEUE / _QUEUE_TIMEOUT_MS
+ROUTE_DEFAULTS = {
+    "search": {"max_concurrency": 16, "max_queue": 32, "queue_timeout_ms": 500},
+    "process": {"max_concurrency": 4, "max_queue": 8, "queue_timeout_ms": 2000},
+    "collections": {"max_concurrency": 8, "max_queue": 16, "queue_timeout_ms": 1000},
+}
+
+
+class AdmissionLimiter:
+    """
+    Concurrency cap with a short bounded wait queue.
+
+    Requests beyond `max_concurrency` wait up to `queue_timeout` seconds for a slot;
+    if the queue is already full, or the wait times out, they are rejected right
+    away with 503 and a Retry-After header instead of piling up latency.
+    """
+
+    def __init__(self, name, max_concurrency, max_queue, queue_timeout_ms, latency_tracker=None):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout_ms / 1000.0
+        self.latency_tracker = latency_tracker
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    def _reject(self, reason):
+        self.rejected += 1
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Server busy ({self.name}: {reason}), retry shortly",
+            headers={"Retry-After": "1"}
+        )
+
+    async def acquire(self):
+        if self.semaphore.locked():
+            if self.waiting >= self.max_queue:
+                self._reject("queue full")
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self.semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                self._reject("queue timeout")
+            finally:
+                self.waiting -= 1
+        else:
+            await self.semaphore.acquire()
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight -= 1
+        self.semaphore.release()
+
+    def stats(self):
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+        }
+
+
+def _route_setting(route, key):
+    value = os.getenv(f"ADMISSION_{route.upper()}_{key.upper()}")
+    return int(value) if value else ROUTE_DEFAULTS[route][key]
+
+
+_limiters = {}
+
+
+def get_limiter(route):
+    if route not in _limiters:
+        _limiters[route] = AdmissionLimiter(
+            route,
+            max_concurrency=_route_setting(route, "max_concurrency"),
+            max_queue=_route_setting(route, "max_queue"),
+            queue_timeout_ms=_route_setting(route, "queue_timeout_ms"),
+            # Search latency drives ingestion back-off (see core/admission.py)
+            latency_tracker=search_latency if route == "search" else None
+        )
+    return _limiters[route]
+
+
+def admission_control(route):
+    """FastAPI dependency that admits a request to `route` or sheds it with 503."""
+    async def dependency(request: Request):
+        # Unauthenticated requests must not take slots or queue places, nor count towards search latency
+        await verify_api_key(request)
+        limiter = get_limiter(route)
+        with stage("admission_wait"):
+            await limiter.acquire()
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            limiter.release()
+            if limiter.latency_tracker:
+                limiter.latency_tracker.record(time.monotonic() - started)
+    return dependency
+
+
+def admission_stats():
+    return {route: limiter.stats() for route, limiter in _limiters.items()}
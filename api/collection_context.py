@@ -0,0 +1,40 @@
+import threading
+from embedding import get_embedding_provider
+from processing.sparse import BM25Encoder, CorpusStats
+
+# Providers for collections embedded with a non-default provider/model, shared across requests
+# so each keeps a single rate-limit scheduler
+_provider_lock = threading.Lock()
+
+
+def resolve_collection(request, name):
+    """Resolve an alias to its collection and return (collection_name, embedding settings)."""
+    collection_name = request.app.state.qdrant_manager.resolve_collection(name)
+    return collection_name, request.app.state.collection_settings.get(collection_name)
+
+
+def get_collection_embedding_provider(request, settings):
+    """Embedding provider matching the provider/model a collection was built with."""
+    state = request.app.state
+    provider_name = settings.get("embedding_provider")
+    model = settings.get("embedding_model")
+    if not provider_name and not model:
+        return state.embedding_provider
+    config = state.config
+    provider_name = provider_name or config.default_embedding_provider
+    if provider_name == config.default_embedding_provider and model in (None, state.embedding_provider.config.model):
+        return state.embedding_provider
+    key = (provider_name, model)
+    with _provider_lock:
+        providers = state.embedding_providers
+        if key not in providers:
+            providers[key] = get_embedding_provider(config, provider_name=provider_name, model=model)
+        return providers[key]
+
+
+
+def get_collection_sparse_encoder(request, collection_name, settings):
+    """BM25 encoder for a hybrid collection (backed by its corpus counts), or None for dense-only collections."""
+    if not settings.get("hybrid"):
+        return None
+    return BM25Encoder(CorpusStats(request.app.state.collection_settings, collection_name))
@@ -5,16 +5,20 @@ from fastapi.middleware.cors import CORSMiddleware
 import logging
 from dotenv import load_dotenv
 from qdrant_client import QdrantClient
-from storage.qdrant_manager import QdrantManager
 
-# Load environment variables from .env
+# Load environment variables from .env (before importing modules that read settings at import time)
 load_dotenv()
 
+from storage.qdrant_manager import QdrantManager
+from storage.collection_settings import CollectionSettingsStore
+from retrieval.semantic_cache import SemanticCache
+
 # Import config and provider factories
 from core.config import Config
 from embedding import get_embedding_provider
 from expansion import get_expansion_provider
 from reranking import get_reranker_provider
+from api.profiling import profiling_middleware
 
 # Initialize logging
 logging.basicConfig(level=logging.INFO)
@@ -32,6 +36,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-request stage timings, plus stack sampling on demand (X-Profile header or PROFILE_SAMPLE_RATE)
+app.middleware("http")(profiling_middleware)
+
 # Load config and providers at startup
 @app.on_event("startup")
 def startup_event():
@@ -39,13 +46,26 @@ def startup_event():
     logger.info(f"Loaded config: default_expansion_provider={config.default_expansion_provider}")
     app.state.config = config
     app.state.embedding_provider = get_embedding_provider(config)
+    app.state.embedding_providers = {}  # per-collection provider/model overrides, see api/collection_context.py
     app.state.expansion_provider = get_expansion_provider(config)
     app.state.reranker_provider = get_reranker_provider(config)
     # Initialize Qdrant client and manager
     qdrant_url = config.qdrant.url
     qdrant_port = config.qdrant.port
-    qdrant_client = QdrantClient(host=qdrant_url, port=qdrant_port, timeout=120)
+    qdrant_client = QdrantClient(
+        host=qdrant_url,
+        port=qdrant_port,
+        grpc_port=config.qdrant.grpc_port,
+        prefer_grpc=config.qdrant.prefer_grpc,
+        timeout=120
+    )
     app.state.qdrant_manager = QdrantManager(qdrant_client)
+    app.state.collection_settings = CollectionSettingsStore()
+    # Paraphrased queries reuse earlier results; any write to a collection drops its cached entries
+    app.state.semantic_cache = None
+    if os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() in ("1", "true", "yes"):
+        app.state.semantic_cache = SemanticCache()
+        app.state.qdrant_manager.add_write_listener(app.state.semantic_cache.invalidate)
     logger.info("API startup: config, providers, and Qdrant manager loaded.")
 
 # Exception handler for clean error responses
@@ -62,6 +82,31 @@ async def generic_exception_handler(request: Request, exc: Exception):
 def health():
     return {"status": "ok"}
 
+# Admission control state: per-route limiter counters and the ingestion back-off signal
+@app.get("/admission", tags=["health"])
+async def admission(request: Request):
+    from api.api_key_auth import verify_api_key
+    from api.admission import admission_stats
+    from core.admission import search_latency, ingestion_governor
+    await verify_api_key(request)
+    p95 = search_latency.percentile(0.95)
+    return {
+        "routes": admission_stats(),
+        "search_p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        "search_slo_ms": ingestion_governor.slo * 1000,
+        "ingestion_throttled": ingestion_governor.search_over_slo(),
+        "ingestion_backoffs": ingestion_governor.backoffs,
+        "semantic_cache": request.app.state.semantic_cache.stats() if request.app.state.semantic_cache else None
+    }
+
+# Slowest recent requests with their per-stage breakdown and any sampled profile file
+@app.get("/profiling/requests", tags=["health"])
+async def profiled_requests(request: Request, limit: int = 20, path: str = None):
+    from api.api_key_auth import verify_api_key
+    from core.profiling import slowest_requests, request_history
+    await verify_api_key(request)
+    return {"requests": slowest_requests(limit=limit, path=path), "history_size": len(request_history)}
+
 # Example: Add your route modules here
 from api.routes import search
 from api.routes import collections
@@ -0,0 +1,32 @@
+import hmac
+import os
+import time
+from fastapi import Request
+
+from core.profiling import begin_request, end_request, should_sample
+
+# Requests carrying X-Profile: <PROFILE_ADMIN_KEY> are always stack-sampled; unset disables the header
+PROFILE_HEADER = "X-Profile"
+PROFILE_ADMIN_KEY = os.getenv("PROFILE_ADMIN_KEY")
+
+
+def profile_requested(request: Request):
+    value = request.headers.get(PROFILE_HEADER)
+    return bool(PROFILE_ADMIN_KEY and value and hmac.compare_digest(value, PROFILE_ADMIN_KEY))
+
+
+async def profiling_middleware(request: Request, call_next):
+    """Record stage timings for every request; stack-sample the ones asked for by header or sample rate."""
+    sampled = profile_requested(request) or should_sample()
+    profile, token = begin_request(request.method, request.url.path, sampled=sampled)
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        record = end_request(profile, token, status_code, time.perf_counter() - started)
+    response.headers["X-Request-Duration-Ms"] = str(record["duration_ms"])
+    if record["profile"]:
+        response.headers["X-Profile-Id"] = record["id"]
+    return response
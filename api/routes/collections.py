@@ -1,28 +1,66 @@
-from fastapi import APIRouter, HTTPException, Request
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Request
+from pydantic import BaseModel, Field
 from typing import Optional
 import logging
+import os
+import threading
+import uuid
 from api.api_key_auth import verify_api_key
+from api.admission import admission_control
+from storage.collection_settings import validate_settings
+from storage.snapshot import check_import_target, export_collection, import_collection, imported_settings, read_manifest
+from storage.collection_settings import embedding_options
+from processing.reindexer import Reindexer, load_checkpoint, shadow_collection_name
+from api.collection_context import get_collection_embedding_provider
+from processing.sparse import BM25Encoder, CorpusStats
 
-router = APIRouter(prefix="/collections", tags=["collections"])
+router = APIRouter(prefix="/collections", tags=["collections"], dependencies=[Depends(admission_control("collections"))])
 logger = logging.getLogger("api.collections")
 
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "data/snapshots")
+
+# In-memory status of export/import tasks
+collection_task_store = {}
+task_lock = threading.Lock()
+
 class CreateCollectionRequest(BaseModel):
     collection_name: str
     vector_size: int = 1024
     distance: str = "cosine"
+    # jina-embeddings-v3 settings; embedding_dimensions defaults to vector_size when only one is given
+    embedding_dimensions: Optional[int] = None
+    embedding_task: Optional[str] = "retrieval"
+    embedding_type: str = "float"
+    # Also store BM25 sparse vectors and search with dense + sparse rank fusion
+    hybrid: bool = True
 
 @router.post("/", status_code=201)
 async def create_collection(request: Request, body: CreateCollectionRequest):
     await verify_api_key(request)
     qdrant_manager = request.app.state.qdrant_manager
+    vector_size = body.vector_size
+    if body.embedding_dimensions and "vector_size" not in body.model_fields_set:
+        vector_size = body.embedding_dimensions
+    try:
+        validate_settings(vector_size, body.embedding_dimensions, body.embedding_task, body.embedding_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     try:
         qdrant_manager.create_collection(
             collection_name=body.collection_name,
-            vector_size=body.vector_size,
-            distance=body.distance
+            vector_size=vector_size,
+            distance=body.distance,
+            binary_quantization=body.embedding_type != "float",
+            sparse_vectors=body.hybrid
         )
-        return {"status": "ok", "collection": body.collection_name}
+        request.app.state.collection_settings.set(body.collection_name, {
+            # Only request truncated vectors when the size differs from the model default
+            "embedding_dimensions": vector_size if vector_size != 1024 or body.embedding_dimensions else None,
+            "embedding_task": body.embedding_task,
+            "embedding_type": body.embedding_type,
+            "hybrid": body.hybrid
+        })
+        return {"status": "ok", "collection": body.collection_name, "vector_size": vector_size}
     except Exception as e:
         logger.error(f"Create collection error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -49,13 +87,218 @@ async def get_collection(request: Request, collection_name: str):
         logger.error(f"Get collection error: {e}", exc_info=True)
         raise HTTPException(status_code=404, detail=str(e))
 
+@router.get("/{collection_name}/settings")
+async def get_collection_settings(request: Request, collection_name: str):
+    await verify_api_key(request)
+    resolved = request.app.state.qdrant_manager.resolve_collection(collection_name)
+    return {"collection": resolved, "settings": request.app.state.collection_settings.get(resolved)}
+
 @router.delete("/{collection_name}")
 async def delete_collection(request: Request, collection_name: str):
     await verify_api_key(request)
     qdrant_manager = request.app.state.qdrant_manager
     try:
-        qdrant_manager.delete_collection(collection_name)
-        return {"status": "deleted", "collection": collection_name}
+        # After a reindex the name is an alias; delete the collection behind it and that collection's settings
+        resolved = qdrant_manager.resolve_collection(collection_name)
+        qdrant_manager.delete_collection(resolved)
+        request.app.state.collection_settings.delete(resolved)
+        return {"status": "deleted", "collection": collection_name, "resolved_collection": resolved}
     except Exception as e:
         logger.error(f"Delete collection error: {e}", exc_info=True)
         raise HTTPException(status_code=404, detail=str(e))
+
+class ExportRequest(BaseModel):
+    snapshot_name: Optional[str] = None
+    batch_size: int = Field(256, ge=1)
+    restart: bool = False
+
+class ImportRequest(BaseModel):
+    snapshot_name: str
+    batch_size: int = Field(256, ge=1)
+    parallel: int = Field(4, ge=1)
+    restart: bool = False
+    restore_settings: bool = True
+
+def snapshot_path(snapshot_name: str):
+    # Snapshots always live directly under SNAPSHOT_DIR
+    name = os.path.basename(snapshot_name or "")
+    if not name or name in (".", ".."):
+        raise HTTPException(status_code=400, detail="Invalid snapshot_name")
+    return os.path.join(SNAPSHOT_DIR, name)
+
+def start_collection_task(kind, collection_name, target):
+    """Run `target(progress_callback)` in a background thread and track it in collection_task_store."""
+    task_id = str(uuid.uuid4())
+    with task_lock:
+        collection_task_store[task_id] = {
+            "type": kind, "collection": collection_name, "processed": 0, "total": None, "percent": 0, "done": False
+        }
+    def progress_callback(progress):
+        with task_lock:
+            collection_task_store[task_id].update(progress)
+    def run():
+        try:
+            logger.info(f"[{kind}] Task {task_id} started for collection '{collection_name}'")
+            result = target(progress_callback)
+            with task_lock:
+                collection_task_store[task_id].update({"done": True, "percent": 100, "result": result})
+            logger.info(f"[{kind}] Task {task_id} finished for collection '{collection_name}'")
+        except Exception as e:
+            logger.error(f"[{kind}] Task {task_id} failed: {e}", exc_info=True)
+            with task_lock:
+                collection_task_store[task_id].update({"done": True, "error": str(e)})
+    threading.Thread(target=run, daemon=True).start()
+    return task_id
+
+def running_reindex(qdrant_manager, collection_name):
+    """Id of an unfinished reindex task reading `collection_name` (or the collection it points to), else None."""
+    resolved = qdrant_manager.resolve_collection(collection_name)
+    with task_lock:
+        tasks = [(task_id, task["collection"]) for task_id, task in collection_task_store.items()
+                 if task["type"] == "reindex" and not task["done"]]
+    for task_id, name in tasks:
+        if name == collection_name or qdrant_manager.resolve_collection(name) == resolved:
+            return task_id
+    return None
+
+@router.post("/{collection_name}/export", status_code=202)
+async def export_collection_endpoint(request: Request, collection_name: str, body: ExportRequest):
+    """Stream a collection into SNAPSHOT_DIR/<snapshot_name>; re-posting resumes an unfinished export."""
+    await verify_api_key(request)
+    qdrant_manager = request.app.state.qdrant_manager
+    path = snapshot_path(body.snapshot_name or collection_name)
+    # Export the collection an alias points to, with that collection's settings
+    resolved = qdrant_manager.resolve_collection(collection_name)
+    settings = request.app.state.collection_settings.get(resolved)
+    task_id = start_collection_task("export", collection_name, lambda progress: export_collection(
+        qdrant_manager, resolved, path, settings=settings, batch_size=body.batch_size,
+        restart=body.restart, progress_callback=progress
+    ))
+    return {"status": "started", "task_id": task_id, "snapshot": os.path.basename(path)}
+
+@router.post("/{collection_name}/import", status_code=202)
+async def import_collection_endpoint(request: Request, collection_name: str, body: ImportRequest):
+    """Bulk-load SNAPSHOT_DIR/<snapshot_name> into `collection_name` without re-embedding."""
+    await verify_api_key(request)
+    qdrant_manager = request.app.state.qdrant_manager
+    collection_settings = request.app.state.collection_settings
+    path = snapshot_path(body.snapshot_name)
+    manifest = read_manifest(path)
+    if not manifest or not manifest.get("complete"):
+        raise HTTPException(status_code=404, detail=f"No complete snapshot named '{body.snapshot_name}'")
+    # Importing into an alias writes to the collection it points to
+    resolved = qdrant_manager.resolve_collection(collection_name)
+    try:
+        check_import_target(qdrant_manager, resolved, manifest)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def run(progress):
+        result = import_collection(
+            qdrant_manager, path, collection_name=resolved, batch_size=body.batch_size,
+            parallel=body.parallel, restart=body.restart, progress_callback=progress
+        )
+        # Only replace the target's settings once the snapshot's vectors are actually in it
+        if body.restore_settings and manifest.get("settings"):
+            collection_settings.set(resolved, imported_settings(manifest, collection_settings.get(resolved)))
+        return result
+    task_id = start_collection_task("import", collection_name, run)
+    return {"status": "started", "task_id": task_id}
+
+class ReindexRequest(BaseModel):
+    # New embedding settings; omitted fields fall back to the app defaults
+    embedding_provider: Optional[str] = None
+    embedding_model: Optional[str] = None
+    embedding_dimensions: Optional[int] = None
+    embedding_task: Optional[str] = "retrieval"
+    embedding_type: str = "float"
+    # Reindexing also upgrades a dense-only collection to hybrid (BM25 vectors are computed from stored text)
+    hybrid: bool = True
+    # Defaults to the distance of the collection being reindexed
+    distance: Optional[str] = None
+    batch_size: int = 256
+    parallel: int = 2
+    max_points_per_minute: Optional[int] = None
+    delete_old: bool = False
+
+@router.post("/{collection_name}/reindex", status_code=202)
+async def reindex_collection(request: Request, collection_name: str, body: ReindexRequest):
+    """
+    Re-embed `collection_name` into a shadow collection and swap the alias when done.
+    Search keeps working on the old vectors until the swap. Re-posting resumes an unfinished reindex.
+    """
+    await verify_api_key(request)
+    qdrant_manager = request.app.state.qdrant_manager
+    collection_settings = request.app.state.collection_settings
+    # A second job would "resume" the same checkpoint in parallel and both would swap the alias
+    running = running_reindex(qdrant_manager, collection_name)
+    if running:
+        raise HTTPException(status_code=409, detail=f"Reindex of '{collection_name}' already running (task {running})")
+    if not body.delete_old and qdrant_manager.is_plain_collection(collection_name):
+        raise HTTPException(status_code=400, detail=f"'{collection_name}' is a plain collection: its first reindex "
+                                                    f"deletes it to create the alias of the same name. "
+                                                    f"Set delete_old to true to confirm.")
+    checkpoint = load_checkpoint(collection_name)
+    if checkpoint and not checkpoint.get("complete"):
+        # Resume with the settings the shadow collection was started with
+        target = checkpoint["target"]
+        settings = collection_settings.get(target)
+    else:
+        target = shadow_collection_name(collection_name)
+        settings = {
+            "embedding_provider": body.embedding_provider,
+            "embedding_model": body.embedding_model,
+            "embedding_dimensions": body.embedding_dimensions,
+            "embedding_task": body.embedding_task,
+            "embedding_type": body.embedding_type,
+            "hybrid": body.hybrid
+        }
+    try:
+        validate_settings(settings.get("embedding_dimensions"), settings.get("embedding_dimensions"),
+                          settings.get("embedding_task"), settings.get("embedding_type"))
+        # Shared with search/ingestion so the reindex draws from the same rate-limit budget and search reserve
+        provider = get_collection_embedding_provider(request, settings)
+    except (ValueError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    collection_settings.set(target, settings)
+    sparse_encoder = BM25Encoder(CorpusStats(collection_settings, target)) if settings.get("hybrid") else None
+    options = embedding_options(settings, "passage")
+    reindexer = Reindexer(
+        qdrant_manager, provider, embedding_options=options,
+        batch_size=body.batch_size, parallel=body.parallel, max_points_per_minute=body.max_points_per_minute,
+        sparse_encoder=sparse_encoder
+    )
+
+    def target_vector_size():
+        if qdrant_manager.collection_exists(target):
+            return qdrant_manager.get_vector_size(target)
+        if settings.get("embedding_dimensions"):
+            return settings["embedding_dimensions"]
+        # The new model's native size: embed one probe text with the target options
+        vector_size = provider.get_embeddings_array(["dimension probe"], background=True, **options).shape[1]
+        validate_settings(vector_size, None, settings.get("embedding_task"), settings.get("embedding_type"))
+        return vector_size
+
+    def run(progress):
+        distance = body.distance or qdrant_manager.get_distance(qdrant_manager.resolve_collection(collection_name))
+        result = reindexer.run(
+            collection_name, target, vector_size=target_vector_size(), distance=distance or "cosine",
+            binary_quantization=settings.get("embedding_type", "float") != "float",
+            sparse_vectors=sparse_encoder is not None, delete_old=body.delete_old, progress_callback=progress
+        )
+        # The name is now an alias; settings are looked up on the collection it points to
+        collection_settings.delete(collection_name)
+        if body.delete_old:
+            collection_settings.delete(result["source"])
+        return result
+    task_id = start_collection_task("reindex", collection_name, run)
+    return {"status": "started", "task_id": task_id, "target": target}
+
+@router.get("/{collection_name}/tasks/{task_id}")
+async def collection_task_status(request: Request, collection_name: str, task_id: str):
+    await verify_api_key(request)
+    with task_lock:
+        task = collection_task_store.get(task_id)
+        if not task or task["collection"] != collection_name:
+            raise HTTPException(status_code=404, detail="Task not found")
+        return dict(task)
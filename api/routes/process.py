@@ -1,17 +1,31 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Request, Body
+from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, Request, Body
 from fastapi.responses import JSONResponse
-from typing import Optional
+from fastapi.concurrency import run_in_threadpool
+from typing import List, Optional
 import os
 import io
 import csv
 import json
 import logging
+import shutil
+import tempfile
 import threading
 import uuid
 
 from processing.chunker import Chunker
 from processing.processor import Processor
+from processing.dedup import ChunkDeduplicator, DEDUP_MODE
 from api.api_key_auth import verify_api_key
+from api.admission import admission_control
+from core.profiling import stage
+from api.routes.collections import running_reindex
+from api.collection_context import (
+    resolve_collection, get_collection_embedding_provider, get_collection_sparse_encoder
+)
+from storage.collection_settings import check_vector_size, embedding_options
+from api.routes.process_utils import (
+    UnsupportedFileError, decode_text, is_archive, list_archive_members, iter_archive_members
+)
 
 router = APIRouter(prefix="/process", tags=["process"])
 logger = logging.getLogger("api.process")
@@ -41,36 +55,69 @@ def read_file_content(upload_file: UploadFile):
         ext = os.path.splitext(filename)[1].lower()
         if ext in [".md", ".txt", ".csv", ".json"]:
             try:
-                text = content.decode("utf-8")
-                if ext == ".json":
-                    return json.dumps(json.loads(text), indent=2), filename
-                return text, filename
-            except Exception:
-                raise HTTPException(status_code=415, detail=f"Could not decode file {filename} as text")
+                return decode_text(content, filename), filename
+            except UnsupportedFileError as e:
+                raise HTTPException(status_code=415, detail=str(e))
     # Otherwise, unsupported
     raise HTTPException(status_code=415, detail=f"Unsupported file type: {content_type}, filename: {filename}")
 
-@router.post("/")
+def collection_embedding(request: Request, collection_name: str):
+    """
+    Embedding provider, passage-side options and BM25 encoder (hybrid collections only)
+    for a collection (or alias), after checking its vector size still matches its settings.
+    """
+    resolved, settings = resolve_collection(request, collection_name)
+    try:
+        check_vector_size(request.app.state.qdrant_manager, resolved, settings)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return (get_collection_embedding_provider(request, settings), embedding_options(settings, "passage"),
+            get_collection_sparse_encoder(request, resolved, settings))
+
+def check_no_reindex(request: Request, collection_name: str):
+    """Points written while a reindex runs would not reach the shadow collection; refuse them with 409."""
+    task_id = running_reindex(request.app.state.qdrant_manager, collection_name)
+    if task_id:
+        raise HTTPException(status_code=409, detail=f"Collection '{collection_name}' is being reindexed (task {task_id}); "
+                                                    f"retry when it has finished")
+
+def chunk_deduplicator(request: Request, mode: Optional[str]):
+    """Near-duplicate filter for the requested `dedup` mode (default DEDUP_MODE); None when "off"."""
+    mode = mode or DEDUP_MODE
+    if mode == "off":
+        return None
+    try:
+        return ChunkDeduplicator(request.app.state.qdrant_manager, mode=mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/", dependencies=[Depends(admission_control("process"))])
 async def process_file(
     request: Request,
     file: UploadFile = File(...),
     collection_name: str = Form(...),
     metadata: Optional[str] = Form(None),
     chunk_size: Optional[int] = Form(1000),
-    overlap_size: Optional[int] = Form(100)
+    overlap_size: Optional[int] = Form(100),
+    dedup: Optional[str] = Form(None)
 ):
     await verify_api_key(request)
+    check_no_reindex(request, collection_name)
+    embedding_provider, options, sparse_encoder = collection_embedding(request, collection_name)
+    deduplicator = chunk_deduplicator(request, dedup)
     try:
-        text, filename = read_file_content(file)
+        with stage("read_upload"):
+            text, filename = read_file_content(file)
         meta = json.loads(metadata) if metadata else {}
         meta["filename"] = filename
-        embedding_provider = request.app.state.embedding_provider
         storage_manager = request.app.state.qdrant_manager
         chunker = Chunker(max_tokens=chunk_size, overlap_tokens=overlap_size)
-        processor = Processor(chunker, embedding_provider, storage_manager)
+        processor = Processor(chunker, embedding_provider, storage_manager, embedding_options=options,
+                              sparse_encoder=sparse_encoder, deduplicator=deduplicator)
         task_id = str(uuid.uuid4())
         # Chunk the document up front to get total
-        chunks = chunker.chunk(text, metadata=meta)
+        with stage("chunk"):
+            chunks = chunker.chunk(text, metadata=meta)
         total_chunks = len(chunks)
         with store_lock:
             ingest_progress_store[task_id] = {"processed": 0, "total": total_chunks, "percent": 0, "done": False}
@@ -108,3 +155,117 @@ async def ingest_progress(task_id: str, request: Request):
         if not progress:
             raise HTTPException(status_code=404, detail="Task not found")
         return progress
+
+def _spool_upload(upload_file: UploadFile, directory: str, index: int):
+    """Copy an upload to disk in fixed-size blocks so the ingest thread can read it after the request closes."""
+    path = os.path.join(directory, f"{index:06d}")
+    upload_file.file.seek(0)
+    with open(path, "wb") as out:
+        shutil.copyfileobj(upload_file.file, out, length=1024 * 1024)
+    return path
+
+def _spool_uploads(files, archive, spool_dir):
+    """Spool all uploads and count archive members; blocking (archive listing may decompress it), run off the event loop."""
+    spooled = [(_spool_upload(f, spool_dir, i), f.filename or f"uploaded-{i}") for i, f in enumerate(files)]
+    archive_spooled = None
+    files_total = len(spooled)
+    if archive:
+        archive_path = _spool_upload(archive, spool_dir, len(spooled))
+        archive_spooled = (archive_path, archive.filename)
+        with open(archive_path, "rb") as f:
+            files_total += len(list_archive_members(f, archive.filename))
+    return spooled, archive_spooled, files_total
+
+def _iter_documents(spooled, archive_spooled, base_meta):
+    """Yield documents for Processor.process_documents, reading one file at a time from disk."""
+    for path, filename in spooled:
+        try:
+            with open(path, "rb") as f:
+                text = decode_text(f.read(), filename)
+            yield {"name": filename, "text": text, "metadata": dict(base_meta)}
+        except UnsupportedFileError as e:
+            yield {"name": filename, "error": str(e)}
+    if archive_spooled:
+        path, archive_name = archive_spooled
+        with open(path, "rb") as f:
+            for member_name, content in iter_archive_members(f, archive_name):
+                meta = dict(base_meta)
+                meta["archive"] = archive_name
+                try:
+                    yield {"name": member_name, "text": decode_text(content, member_name), "metadata": meta}
+                except UnsupportedFileError as e:
+                    yield {"name": member_name, "error": str(e)}
+
+@router.post("/batch", dependencies=[Depends(admission_control("process"))])
+async def process_batch(
+    request: Request,
+    files: List[UploadFile] = File(default=[]),
+    archive: Optional[UploadFile] = File(None),
+    collection_name: str = Form(...),
+    metadata: Optional[str] = Form(None),
+    chunk_size: Optional[int] = Form(1000),
+    overlap_size: Optional[int] = Form(100),
+    dedup: Optional[str] = Form(None)
+):
+    """
+    Ingest many files in one request: any number of `files` parts and/or one zip/tar `archive`.
+    Chunks from all files are packed into full EMBEDDING_BATCH_SIZE batches; per-file status
+    is reported under "files" in /process/ingest-progress/{task_id}.
+    """
+    await verify_api_key(request)
+    files = files or []
+    if not files and not archive:
+        raise HTTPException(status_code=400, detail="Provide at least one file or an archive")
+    if archive and not is_archive(archive.filename):
+        raise HTTPException(status_code=415, detail=f"Unsupported archive type: {archive.filename}")
+    meta = json.loads(metadata) if metadata else {}
+    check_no_reindex(request, collection_name)
+    embedding_provider, options, sparse_encoder = collection_embedding(request, collection_name)
+    deduplicator = chunk_deduplicator(request, dedup)
+    spool_dir = tempfile.mkdtemp(prefix="ingest-")
+    try:
+        with stage("spool_upload"):
+            spooled, archive_spooled, files_total = await run_in_threadpool(_spool_uploads, files, archive, spool_dir)
+    except Exception as e:
+        shutil.rmtree(spool_dir, ignore_errors=True)
+        logger.error(f"Process batch error: {e}", exc_info=True)
+        raise HTTPException(status_code=400, detail=f"Could not read upload: {e}")
+
+    storage_manager = request.app.state.qdrant_manager
+    chunker = Chunker(max_tokens=chunk_size, overlap_tokens=overlap_size)
+    processor = Processor(chunker, embedding_provider, storage_manager, embedding_options=options,
+                          sparse_encoder=sparse_encoder, deduplicator=deduplicator)
+    task_id = str(uuid.uuid4())
+    with store_lock:
+        ingest_progress_store[task_id] = {
+            "processed": 0, "total": 0, "percent": 0, "done": False,
+            "files_total": files_total, "files_done": 0, "files_failed": 0, "files": {}
+        }
+    def progress_callback(progress):
+        progress = dict(progress)
+        changed_files = progress.pop("files", {})
+        with store_lock:
+            entry = ingest_progress_store[task_id]
+            entry.update(progress)
+            entry["files"].update(changed_files)
+    def run_ingest():
+        try:
+            logger.info(f"[Ingest] Batch thread started for task {task_id} ({files_total} files)")
+            processor.process_documents(
+                _iter_documents(spooled, archive_spooled, {"collection_name": collection_name, **meta}),
+                collection_name=collection_name,
+                files_total=files_total,
+                progress_callback=progress_callback
+            )
+            logger.info(f"[Ingest] Batch thread finished for task {task_id}")
+        except Exception as e:
+            logger.error(f"[Ingest] Error in batch thread for task {task_id}: {e}", exc_info=True)
+            with store_lock:
+                ingest_progress_store[task_id]["error"] = str(e)
+                ingest_progress_store[task_id]["done"] = True
+        finally:
+            shutil.rmtree(spool_dir, ignore_errors=True)
+    thread = threading.Thread(target=run_ingest, daemon=True)
+    thread.start()
+    logger.info(f"[Process] Started batch ingestion thread for task {task_id} (files_total={files_total})")
+    return JSONResponse(content={"status": "started", "task_id": task_id, "files_total": files_total})
@@ -1,4 +1,79 @@
 import os
-from typing import List
+import json
+import tarfile
+import zipfile
+from typing import Iterator, Tuple
 
-# SUPPORTED_EXTENSIONS and find_supported_files are no longer needed since directory processing is removed.
+SUPPORTED_EXTENSIONS = {".md", ".txt", ".csv", ".json"}
+ZIP_EXTENSIONS = (".zip",)
+TAR_EXTENSIONS = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+
+class UnsupportedFileError(ValueError):
+    """Raised when a file cannot be read as one of the supported text formats."""
+
+
+def decode_text(content: bytes, filename: str) -> str:
+    """Decode raw bytes of a supported file into the text that gets chunked."""
+    ext = os.path.splitext(filename)[1].lower()
+    if ext not in SUPPORTED_EXTENSIONS:
+        raise UnsupportedFileError(f"Unsupported file extension: {filename}")
+    try:
+        text = content.decode("utf-8")
+        if ext == ".json":
+            return json.dumps(json.loads(text), indent=2)
+        return text
+    except Exception:
+        raise UnsupportedFileError(f"Could not decode file {filename} as text")
+
+
+def is_archive(filename: str) -> bool:
+    name = (filename or "").lower()
+    return name.endswith(ZIP_EXTENSIONS) or name.endswith(TAR_EXTENSIONS)
+
+
+def _is_supported_member(name: str) -> bool:
+    base = os.path.basename(name)
+    # Skip hidden files and macOS resource forks (e.g. __MACOSX/._file.md)
+    if not base or base.startswith(".") or "__MACOSX/" in name:
+        return False
+    return os.path.splitext(base)[1].lower() in SUPPORTED_EXTENSIONS
+
+
+def list_archive_members(fileobj, filename: str):
+    """Return the names of supported text files inside a zip or tar archive.
+
+    Only the archive index is read, so this is cheap even for large archives.
+    """
+    fileobj.seek(0)
+    if filename.lower().endswith(ZIP_EXTENSIONS):
+        with zipfile.ZipFile(fileobj) as zf:
+            return [info.filename for info in zf.infolist() if not info.is_dir() and _is_supported_member(info.filename)]
+    with tarfile.open(fileobj=fileobj, mode="r:*") as tf:
+        return [m.name for m in tf.getmembers() if m.isfile() and _is_supported_member(m.name)]
+
+
+def iter_archive_members(fileobj, filename: str) -> Iterator[Tuple[str, bytes]]:
+    """Yield (member_name, raw_bytes) for each supported file in the archive.
+
+    Members are read one at a time from the (disk-spooled) upload, so memory use
+    is bounded by the largest single member rather than the archive size.
+    """
+    fileobj.seek(0)
+    if filename.lower().endswith(ZIP_EXTENSIONS):
+        with zipfile.ZipFile(fileobj) as zf:
+            for info in zf.infolist():
+                if info.is_dir() or not _is_supported_member(info.filename):
+                    continue
+                with zf.open(info) as member:
+                    yield info.filename, member.read()
+        return
+    # Streaming mode ("r|*") decompresses sequentially without seeking back
+    with tarfile.open(fileobj=fileobj, mode="r|*") as tf:
+        for member in tf:
+            if not member.isfile() or not _is_supported_member(member.name):
+                continue
+            extracted = tf.extractfile(member)
+            if extracted is None:
+                continue
+            yield member.name, extracted.read()
@@ -1,11 +1,19 @@
-from fastapi import APIRouter, Request, HTTPException
+from fastapi import APIRouter, Depends, Request, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import List, Optional
+import json
 import logging
 from api.api_key_auth import verify_api_key
+from api.admission import admission_control
+from core.profiling import stage
 
 # Import Retriever from retrieval
 from retrieval.retriever import Retriever
+from storage.collection_settings import embedding_options
+from api.collection_context import (
+    resolve_collection, get_collection_embedding_provider, get_collection_sparse_encoder
+)
 
 logger = logging.getLogger("api.search")
 
@@ -14,7 +22,8 @@ router = APIRouter(prefix="/search", tags=["search"])
 class SearchRequest(BaseModel):
     query: str
     limit: Optional[int] = 10
-    use_expansion: Optional[bool] = True
+    # None: expand only on dense-only collections; hybrid collections get exact-term recall from BM25
+    use_expansion: Optional[bool] = None
     collection_name: Optional[str] = "content_library"
     expansion_model: Optional[str] = None
     filter: Optional[dict] = None
@@ -33,43 +42,86 @@ class SearchResponse(BaseModel):
     results: List[SearchResult]
     expanded_query: Optional[str] = None
     expansion_model: Optional[str] = None
+    cache_hit: bool = False
 
-@router.post("/", response_model=SearchResponse)
+def run_search(request: Request, body: SearchRequest):
+    """Blocking search pipeline (expansion, embedding, Qdrant); run off the event loop."""
+    config = request.app.state.config
+    # collection_name may be an alias; settings belong to the collection it points to
+    with stage("resolve_collection"):
+        collection_name, settings = resolve_collection(request, body.collection_name)
+        embedding_provider = get_collection_embedding_provider(request, settings)
+    reranker_provider = request.app.state.reranker_provider
+    qdrant_manager = request.app.state.qdrant_manager
+    query_options = embedding_options(settings, "query")
+    sparse_encoder = get_collection_sparse_encoder(request, collection_name, settings)
+    use_expansion = body.use_expansion if body.use_expansion is not None else sparse_encoder is None
+    # Expansion provider selection
+    expansion_model = body.expansion_model or getattr(config, "default_expansion_provider", None)
+    # Semantic cache: embed the raw query and reuse the response of a near-identical earlier query
+    cache = request.app.state.semantic_cache
+    query_vector = None
+    if cache is not None:
+        with stage("query_embedding"):
+            query_vector = embedding_provider.get_query_embedding(body.query, **query_options)
+        # On hybrid collections exact terms matter: "ABC-123" must not hit the cached "ABC-124" results
+        terms = sorted(sparse_encoder.encode_query(body.query)["indices"]) if sparse_encoder else None
+        params_key = hash(json.dumps([body.limit, use_expansion, expansion_model, body.filter, terms],
+                                     sort_keys=True, default=str))
+        with stage("semantic_cache"):
+            # Read before searching: a write during the search makes this response stale
+            generation = cache.generation(collection_name)
+            cached = cache.lookup(collection_name, query_vector, params_key)
+        if cached is not None:
+            logger.info(f"Semantic cache hit for query: {body.query}")
+            return {**cached, "cache_hit": True}
+    expansion_provider = None
+    expanded_query = None
+    if use_expansion and expansion_model:
+        from expansion import get_expansion_provider
+        with stage("expansion"):
+            expansion_provider = get_expansion_provider(config, provider_name=expansion_model)
+            expanded_query = expansion_provider.expand_query(body.query)
+        search_query = expanded_query
+    else:
+        search_query = body.query
+    retriever = Retriever(
+        embedding_provider=embedding_provider,
+        reranker_provider=reranker_provider,
+        storage_manager=qdrant_manager
+    )
+    # Build filter for retriever
+    retriever_filter = body.filter if body.filter else None
+    # Query-side embedding options (e.g. retrieval.query task, output dimensions) for this collection
+    results = retriever.search(
+        query=search_query,
+        limit=body.limit,
+        use_expansion=False,  # expansion already applied
+        collection_name=body.collection_name,
+        filter=retriever_filter,
+        embedding_options=query_options,
+        sparse_encoder=sparse_encoder,
+        # The raw query embedding is reusable unless expansion changed the text
+        query_vector=query_vector if search_query == body.query else None
+    )
+    if isinstance(results, dict) and "error" in results:
+        raise HTTPException(status_code=500, detail=results["error"])
+    response = {"results": results, "expanded_query": expanded_query, "expansion_model": expansion_model}
+    if cache is not None:
+        cache.store(collection_name, query_vector, params_key, response, generation=generation)
+    return response
+
+@router.post("/", response_model=SearchResponse, dependencies=[Depends(admission_control("search"))])
 async def search_endpoint(request: Request, body: SearchRequest):
     await verify_api_key(request)
     try:
-        config = request.app.state.config
-        embedding_provider = request.app.state.embedding_provider
-        reranker_provider = request.app.state.reranker_provider
-        qdrant_manager = request.app.state.qdrant_manager
-        # Expansion provider selection
-        expansion_model = body.expansion_model or getattr(config, "default_expansion_provider", None)
-        expansion_provider = None
-        expanded_query = None
-        if body.use_expansion and expansion_model:
-            from expansion import get_expansion_provider
-            expansion_provider = get_expansion_provider(config, provider_name=expansion_model)
-            expanded_query = expansion_provider.expand_query(body.query)
-            search_query = expanded_query
-        else:
-            search_query = body.query
-        retriever = Retriever(
-            embedding_provider=embedding_provider,
-            reranker_provider=reranker_provider,
-            storage_manager=qdrant_manager
-        )
-        # Build filter for retriever
-        retriever_filter = body.filter if body.filter else None
-        results = retriever.search(
-            query=search_query,
-            limit=body.limit,
-            use_expansion=False,  # expansion already applied
-            collection_name=body.collection_name,
-            filter=retriever_filter
-        )
-        if isinstance(results, dict) and "error" in results:
-            raise HTTPException(status_code=500, detail=results["error"])
-        return {"results": results, "expanded_query": expanded_query, "expansion_model": expansion_model}
+        # Provider and Qdrant calls block; running them in the threadpool lets admitted searches overlap
+        result = await run_in_threadpool(run_search, request, body)
+        # Validate and encode here rather than in FastAPI so each shows up as its own profiling stage
+        with stage("response_validation"):
+            response = SearchResponse.model_validate(result)
+        with stage("json_encode"):
+            return Response(content=response.model_dump_json(), media_type="application/json")
     except Exception as e:
         logger.error(f"Search error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -0,0 +1,136 @@
+"""
+Compare the JSON float-list embedding path with the base64/float32 array path.
+
+Simulates one embedding batch end to end without network access, including the
+conversion qdrant-client does inside QdrantManager.upsert_batch:
+  json:   provider JSON response -> lists of Python floats
+  base64: provider base64 response -> np.frombuffer -> 2-D float32 array
+then, for both, the uploader's own code: tolist() of the array, one PointStruct per
+point, and the request body (JSON over REST, protobuf over gRPC). Only the network
+call is replaced by serializing the request.
+
+Usage: python bench_vector_path.py [--batch 100] [--dim 1024] [--rounds 20] [--transport rest|grpc] [--hybrid]
+"""
+import argparse
+import base64
+import json
+import time
+import tracemalloc
+import uuid
+
+import numpy as np
+
+from qdrant_client.http.api.points_api import jsonable_encoder
+from qdrant_client.uploader.grpc_uploader import GrpcBatchUploader, upload_batch_grpc
+from qdrant_client.uploader.rest_uploader import RestBatchUploader, upload_batch
+
+from storage.qdrant_manager import QdrantManager
+
+
+class _RestBody:
+    """Stands in for the REST client: serializes the upsert request as upsert_points would send it."""
+
+    def __init__(self):
+        self.points_api = self
+        self.body = None
+
+    def upsert_points(self, collection_name, point_insert_operations, wait=False):
+        self.body = jsonable_encoder(point_insert_operations)
+
+
+class _GrpcBody:
+    """Stands in for the gRPC stub: serializes the UpsertPoints message."""
+
+    def __init__(self):
+        self.body = None
+
+    def Upsert(self, request, timeout=None):
+        self.body = request.SerializeToString()
+
+
+def make_responses(batch, dim):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((batch, dim)).astype(np.float32)
+    json_body = json.dumps({"data": [{"index": i, "embedding": v.tolist()} for i, v in enumerate(vectors)]})
+    b64_body = json.dumps({"data": [
+        {"index": i, "embedding": base64.b64encode(v.astype("<f4").tobytes()).decode("ascii")}
+        for i, v in enumerate(vectors)
+    ]})
+    return json_body, b64_body
+
+
+def make_sparse(batch, terms=60):
+    rng = np.random.default_rng(1)
+    return [{"indices": rng.choice(2 ** 32, size=terms, replace=False).tolist(), "values": [1.0] * terms}
+            for _ in range(batch)]
+
+
+def upsert_body(vectors, sparse_vectors, transport):
+    """Run the same conversion as QdrantManager.upsert_batch -> upload_collection for one batch."""
+    ids = [str(uuid.uuid4()) for _ in range(len(vectors))]
+    payloads = [{"text": ""} for _ in ids]
+    vectors = QdrantManager.batch_vectors(vectors, sparse_vectors)
+    if transport == "grpc":
+        sink = _GrpcBody()
+        for batch in GrpcBatchUploader.iterate_batches(vectors, payloads, ids, len(ids)):
+            upload_batch_grpc(sink, "bench", batch, max_retries=1, shard_key_selector=None, wait=True)
+    else:
+        sink = _RestBody()
+        for batch in RestBatchUploader.iterate_batches(vectors, payloads, ids, len(ids)):
+            upload_batch(sink, "bench", batch, max_retries=1, shard_key_selector=None, wait=True)
+    return sink.body
+
+
+def decode_json(body):
+    data = json.loads(body)
+    return [item["embedding"] for item in data["data"]]
+
+
+def decode_base64(body):
+    data = json.loads(body)
+    raw = b"".join(base64.b64decode(item["embedding"]) for item in data["data"])
+    return np.frombuffer(raw, dtype="<f4").reshape(len(data["data"]), -1)
+
+
+def full_path(decode):
+    def run(body, sparse_vectors, transport):
+        return upsert_body(decode(body), sparse_vectors, transport)
+    return run
+
+
+def measure(fn, *args, rounds):
+    fn(*args)  # warm up
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn(*args)
+    elapsed = (time.perf_counter() - start) / rounds
+    tracemalloc.start()
+    fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--transport", choices=("rest", "grpc"), default="rest")
+    parser.add_argument("--hybrid", action="store_true", help="also send a BM25 sparse vector per point")
+    args = parser.parse_args()
+
+    json_body, b64_body = make_responses(args.batch, args.dim)
+    sparse_vectors = make_sparse(args.batch) if args.hybrid else None
+    print(f"Batch of {args.batch} x {args.dim}-d vectors, {args.transport}{' hybrid' if args.hybrid else ''}")
+    print(f"{'path':<8} {'response':>10} {'decode':>10} {'to upsert':>10} {'peak mem':>10}")
+    for name, decode, body in (("json", decode_json, json_body), ("base64", decode_base64, b64_body)):
+        decoded, _ = measure(decode, body, rounds=args.rounds)
+        elapsed, peak = measure(full_path(decode), body, sparse_vectors, args.transport, rounds=args.rounds)
+        print(f"{name:<8} {len(body) / 1e6:>8.2f}MB {decoded * 1000:>8.1f}ms {elapsed * 1000:>8.1f}ms "
+              f"{peak / 1e6:>8.2f}MB")
+    print("decode: response to vectors; to upsert: decode plus qdrant-client's conversion to the request body")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Export a Qdrant collection to a snapshot directory, or import one, without re-embedding.
+
+Examples:
+  python collection_snapshot.py export content_library data/snapshots/content_library
+  python collection_snapshot.py import data/snapshots/content_library --collection content_library_copy
+
+Interrupted runs resume from the last completed batch; pass --restart to start over.
+"""
+import argparse
+import os
+from qdrant_client import QdrantClient
+from dotenv import load_dotenv
+
+# Load environment variables from .env file (storage modules read settings at import time)
+load_dotenv()
+
+from storage.qdrant_manager import QdrantManager
+from storage.collection_settings import CollectionSettingsStore
+from storage.snapshot import export_collection, import_collection, imported_settings, read_manifest
+
+QDRANT_URL = os.getenv("QDRANT_URL", "localhost")
+QDRANT_PORT = int(os.getenv("QDRANT_PORT", 6333))
+QDRANT_API_KEY = os.getenv("QDRANT_API_KEY", None)  # Optional API key
+
+
+def print_progress(progress):
+    print(f"\r{progress['processed']}/{progress['total']} points ({progress['percent']}%)", end="", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Export a collection to a snapshot directory")
+    export_parser.add_argument("collection")
+    export_parser.add_argument("snapshot_dir")
+    export_parser.add_argument("--batch-size", type=int, default=256)
+    export_parser.add_argument("--restart", action="store_true")
+
+    import_parser = subparsers.add_parser("import", help="Import a snapshot directory into a collection")
+    import_parser.add_argument("snapshot_dir")
+    import_parser.add_argument("--collection", help="Target collection (default: the exported collection's name)")
+    import_parser.add_argument("--batch-size", type=int, default=256)
+    import_parser.add_argument("--parallel", type=int, default=4)
+    import_parser.add_argument("--restart", action="store_true")
+
+    args = parser.parse_args()
+    client = QdrantClient(url=QDRANT_URL, port=QDRANT_PORT, api_key=QDRANT_API_KEY, timeout=120)
+    manager = QdrantManager(client)
+    settings_store = CollectionSettingsStore()
+
+    if args.command == "export":
+        manifest = export_collection(
+            manager, args.collection, args.snapshot_dir, settings=settings_store.get(args.collection),
+            batch_size=args.batch_size, restart=args.restart, progress_callback=print_progress
+        )
+        print(f"\nExported {manifest['exported']} points from '{args.collection}' to {args.snapshot_dir}")
+    else:
+        manifest = read_manifest(args.snapshot_dir)
+        target = args.collection or (manifest or {}).get("collection")
+        state = import_collection(
+            manager, args.snapshot_dir, collection_name=target, batch_size=args.batch_size,
+            parallel=args.parallel, restart=args.restart, progress_callback=print_progress
+        )
+        if manifest.get("settings"):
+            settings_store.set(target, imported_settings(manifest, settings_store.get(target)))
+        print(f"\nImported {state['imported']} points into '{target}'")
+
+
+if __name__ == "__main__":
+    main()
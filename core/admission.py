@@ -0,0 +1,78 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Search latency objective; background ingestion backs off while recent search p95 exceeds it
+SEARCH_LATENCY_SLO_MS = float(os.getenv("SEARCH_LATENCY_SLO_MS", 1500))
+# Concurrent embedding+upsert batches allowed across all ingestion, import and reindex jobs
+INGEST_MAX_CONCURRENT_BATCHES = int(os.getenv("INGEST_MAX_CONCURRENT_BATCHES", 4))
+# Longest a batch waits for search to get back under its SLO; guarantees ingestion at least one batch per slot this often
+INGEST_MAX_BACKOFF_S = float(os.getenv("INGEST_MAX_BACKOFF_S", 30))
+
+
+class LatencyTracker:
+    """Rolling window of recent request latencies (seconds)."""
+
+    def __init__(self, window=200, max_age=30.0):
+        self.samples = deque(maxlen=window)
+        self.max_age = max_age
+        self.lock = threading.Lock()
+
+    def record(self, latency):
+        with self.lock:
+            self.samples.append((time.monotonic(), latency))
+
+    def percentile(self, q=0.95):
+        """Latency at quantile `q` over samples younger than `max_age`, or None if there are none."""
+        cutoff = time.monotonic() - self.max_age
+        with self.lock:
+            recent = sorted(latency for ts, latency in self.samples if ts >= cutoff)
+        if not recent:
+            return None
+        return recent[min(len(recent) - 1, int(q * len(recent)))]
+
+
+class IngestionGovernor:
+    """
+    Gate for background write work (ingestion, snapshot import, reindex).
+
+    Each embedding/upsert batch runs inside `batch()`, which first waits while search
+    p95 latency is above the SLO (exponential back-off, at most `max_backoff` seconds in
+    total) and then takes one of a fixed number of batch slots, leaving Qdrant and
+    provider capacity for interactive search. The wait is capped because search p95
+    also includes time ingestion does not affect (e.g. LLM query expansion), so a
+    persistently slow search must not stall ingestion forever.
+    """
+
+    def __init__(self, search_latency, slo_ms=SEARCH_LATENCY_SLO_MS, max_batches=INGEST_MAX_CONCURRENT_BATCHES,
+                 max_backoff=INGEST_MAX_BACKOFF_S):
+        self.search_latency = search_latency
+        self.slo = slo_ms / 1000.0
+        self.slots = threading.BoundedSemaphore(max(1, max_batches))
+        self.max_backoff = max_backoff
+        self.backoffs = 0
+
+    def search_over_slo(self):
+        p95 = self.search_latency.percentile(0.95)
+        return p95 is not None and p95 > self.slo
+
+    def wait_for_search(self):
+        delay, waited = 0.5, 0.0
+        while waited < self.max_backoff and self.search_over_slo():
+            self.backoffs += 1
+            pause = min(delay, self.max_backoff - waited)
+            time.sleep(pause)
+            waited += pause
+            delay *= 2
+
+    @contextmanager
+    def batch(self):
+        self.wait_for_search()
+        with self.slots:
+            yield
+
+
+search_latency = LatencyTracker()
+ingestion_governor = IngestionGovernor(search_latency)
@@ -6,11 +6,29 @@ import json
 class ProviderConfig(BaseModel):
     api_key: str
     model: str
+    # Optional request scheduling limits (see embedding/scheduler.py)
+    batch_size: Optional[int] = None
+    max_batch_tokens: Optional[int] = None
+    requests_per_minute: Optional[int] = None
+    tokens_per_minute: Optional[int] = None
+    max_concurrency: Optional[int] = None
     # Add other provider-specific fields as needed
 
+# Optional per-provider env vars, e.g. EMBEDDING_JINA_RPM -> requests_per_minute
+PROVIDER_LIMIT_ENV = {
+    'BATCH_SIZE': 'batch_size',
+    'MAX_BATCH_TOKENS': 'max_batch_tokens',
+    'RPM': 'requests_per_minute',
+    'TPM': 'tokens_per_minute',
+    'MAX_CONCURRENCY': 'max_concurrency',
+}
+
 class QdrantConfig(BaseModel):
     url: str = Field(default="qdrant")
     port: int = Field(default=6333)
+    grpc_port: int = Field(default=6334)
+    # gRPC sends vectors as packed floats instead of JSON number arrays
+    prefer_grpc: bool = Field(default=False)
 
 class Config(BaseModel):
     embedding_providers: Dict[str, ProviderConfig]
@@ -42,6 +60,10 @@ class Config(BaseModel):
                     'api_key': key,
                     'model': model
                 }
+                for suffix, field in PROVIDER_LIMIT_ENV.items():
+                    value = os.getenv(f'EMBEDDING_{provider.upper()}_{suffix}')
+                    if value:
+                        config_data['embedding_providers'][provider][field] = int(value)
         for provider in ['gemini', 'openai']:
             key = os.getenv(f'EXPANSION_{provider.upper()}_API_KEY')
             model = os.getenv(f'EXPANSION_{provider.upper()}_MODEL')
@@ -58,12 +80,18 @@ class Config(BaseModel):
             config_data['default_expansion_provider'] = default_expansion
         qdrant_url = os.getenv('QDRANT_URL')
         qdrant_port = os.getenv('QDRANT_PORT')
-        if qdrant_url or qdrant_port:
+        qdrant_grpc_port = os.getenv('QDRANT_GRPC_PORT')
+        qdrant_prefer_grpc = os.getenv('QDRANT_PREFER_GRPC')
+        if qdrant_url or qdrant_port or qdrant_grpc_port or qdrant_prefer_grpc:
             config_data.setdefault('qdrant', {})
             if qdrant_url:
                 config_data['qdrant']['url'] = qdrant_url
             if qdrant_port:
                 config_data['qdrant']['port'] = int(qdrant_port)
+            if qdrant_grpc_port:
+                config_data['qdrant']['grpc_port'] = int(qdrant_grpc_port)
+            if qdrant_prefer_grpc:
+                config_data['qdrant']['prefer_grpc'] = qdrant_prefer_grpc.lower() in ('1', 'true', 'yes')
 
         # --- Error reporting for missing required config ---
         missing = []
@@ -0,0 +1,180 @@
+"""
+Per-request stage timings and on-demand stack sampling.
+
+Every API request gets a RequestProfile in a context variable; code on the hot
+path wraps its steps in `stage(name)` so the request records how long each step
+took (e.g. query_embedding, qdrant_search). Timings are cheap and kept for all
+requests in a bounded history, used for the slowest-requests view.
+
+Selected requests (admin header or PROFILE_SAMPLE_RATE) are additionally sampled:
+a background thread reads the Python stacks of the threads that ran the request's
+stages every PROFILE_INTERVAL_MS and writes them in collapsed ("folded") format,
+one `frame;frame;frame count` line per stack, to PROFILE_DIR. The files load
+directly into flamegraph.pl, speedscope or inferno.
+"""
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Fraction of requests profiled without the admin header (0 disables sampling)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", 5))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "logs/profiles")
+# Number of recent requests kept for the slowest-requests view
+PROFILE_HISTORY = int(os.getenv("PROFILE_HISTORY", 1000))
+
+_current_profile = ContextVar("request_profile", default=None)
+
+
+class StackSampler:
+    """Sample the stacks of a set of threads at a fixed interval into collapsed-stack counts."""
+
+    def __init__(self, interval_ms=PROFILE_INTERVAL_MS):
+        self.interval = interval_ms / 1000.0
+        # thread ident -> number of active users (nested or concurrent stages on the same thread)
+        self.threads = Counter()
+        self.lock = threading.Lock()
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add_thread(self, ident):
+        with self.lock:
+            self.threads[ident] += 1
+
+    def remove_thread(self, ident):
+        with self.lock:
+            self.threads[ident] -= 1
+            if self.threads[ident] <= 0:
+                del self.threads[ident]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        return self.stacks
+
+    @staticmethod
+    def _collapse(frame):
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self.lock:
+                idents = list(self.threads)
+            for ident in idents:
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.stacks[self._collapse(frame)] += 1
+            self.samples += 1
+
+
+class RequestProfile:
+    def __init__(self, method, path, sampled=False):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.started = time.time()
+        self.stages = {}
+        self.lock = threading.Lock()
+        self.sampler = StackSampler() if sampled else None
+        if self.sampler:
+            self.sampler.add_thread(threading.get_ident())
+            self.sampler.start()
+
+    def add_stage(self, name, elapsed):
+        with self.lock:
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    def finish(self, status_code, duration):
+        """Stop sampling, write the folded stacks and return the summary record."""
+        record = {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": status_code,
+            "started": self.started,
+            "duration_ms": round(duration * 1000, 2),
+            "stages_ms": {name: round(elapsed * 1000, 2) for name, elapsed in self.stages.items()},
+            # Time outside instrumented stages: middleware, routing, request body parsing and validation
+            "other_ms": round(max(0.0, duration - sum(self.stages.values())) * 1000, 2),
+            "profile": None
+        }
+        if self.sampler:
+            stacks = self.sampler.stop()
+            record["samples"] = self.sampler.samples
+            record["profile"] = write_folded(stacks, self)
+        return record
+
+
+def write_folded(stacks, profile):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime(profile.started))}_{profile.method}_" \
+           f"{profile.path.strip('/').replace('/', '_') or 'root'}_{profile.id}.folded"
+    path = os.path.join(PROFILE_DIR, name)
+    with open(path, "w") as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+    return path
+
+
+def should_sample():
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def begin_request(method, path, sampled=False):
+    profile = RequestProfile(method, path, sampled=sampled)
+    return profile, _current_profile.set(profile)
+
+
+def end_request(profile, token, status_code, duration):
+    _current_profile.reset(token)
+    record = profile.finish(status_code, duration)
+    request_history.append(record)
+    return record
+
+
+@contextmanager
+def stage(name):
+    """Time a step of the current request; a no-op outside requests (e.g. background ingestion)."""
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    ident = threading.get_ident()
+    if profile.sampler:
+        # Stages may run in threadpool workers; sample whichever thread is doing the request's work,
+        # and only while it does: shared workers go on to serve other requests
+        profile.sampler.add_thread(ident)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add_stage(name, time.perf_counter() - started)
+        if profile.sampler:
+            profile.sampler.remove_thread(ident)
+
+
+def slowest_requests(limit=20, path=None):
+    records = [r for r in list(request_history) if path is None or r["path"].startswith(path)]
+    return sorted(records, key=lambda r: r["duration_ms"], reverse=True)[:limit]
+
+
+request_history = deque(maxlen=PROFILE_HISTORY)
@@ -1,9 +1,11 @@
 from .jina_provider import JinaEmbeddingProvider
 from .openai_provider import OpenAIEmbeddingProvider
 
-def get_embedding_provider(config, provider_name=None):
+def get_embedding_provider(config, provider_name=None, model=None):
     provider_name = provider_name or config.default_embedding_provider
     provider_cfg = config.embedding_providers[provider_name]
+    if model and model != provider_cfg.model:
+        provider_cfg = provider_cfg.model_copy(update={"model": model})
     if provider_name == 'jina':
         return JinaEmbeddingProvider(provider_cfg)
     elif provider_name == 'openai':
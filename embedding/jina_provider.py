@@ -1,5 +1,9 @@
+import base64
+import os
 import requests
+import numpy as np
 from .provider import EmbeddingProvider
+from .scheduler import EmbeddingScheduler, RateLimitError
 
 JINA_EMBEDDING_ENDPOINT = "https://api.jina.ai/v1/embeddings"
 
@@ -8,7 +12,17 @@ class JinaEmbeddingProvider(EmbeddingProvider):
         super().__init__(config)
         self.api_key = config.api_key
         self.model = config.model
-        self.batch_size = getattr(config, 'batch_size', 100)  # Optional
+        self.batch_size = getattr(config, 'batch_size', None) or 100  # Optional
+        # Shared by all callers of this provider so the rate-limit budget is global
+        self.scheduler = EmbeddingScheduler(
+            max_batch_items=self.batch_size,
+            max_batch_tokens=getattr(config, 'max_batch_tokens', None) or 50000,
+            requests_per_minute=getattr(config, 'requests_per_minute', None) or 500,
+            tokens_per_minute=getattr(config, 'tokens_per_minute', None) or 1000000,
+            max_concurrency=getattr(config, 'max_concurrency', None) or 8,
+            search_reserve=float(os.getenv("EMBEDDING_SEARCH_RESERVE", 0.2))
+        )
+        self.session = requests.Session()
 
     def _headers(self):
         return {
@@ -16,28 +30,68 @@ class JinaEmbeddingProvider(EmbeddingProvider):
             "Content-Type": "application/json"
         }
 
-    def _embed_batch(self, texts):
+    def _embed_batch(self, texts, dimensions=None, task=None, embedding_type=None):
         payload = {
             "input": texts,
             "model": self.model
         }
-        response = requests.post(
+        # jina-embeddings-v3 options: Matryoshka truncation, task LoRA adapter, compact output
+        if dimensions:
+            payload["dimensions"] = dimensions
+        if task:
+            payload["task"] = task
+        # Float vectors travel as base64 little-endian float32 instead of JSON number arrays
+        payload["embedding_type"] = embedding_type or "base64"
+        response = self.session.post(
             JINA_EMBEDDING_ENDPOINT,
             headers=self._headers(),
             json=payload
         )
+        if response.status_code == 429:
+            retry_after = response.headers.get("Retry-After")
+            raise RateLimitError(
+                f"Jina API rate limit: {response.status_code} {response.text}",
+                retry_after=float(retry_after) if retry_after and retry_after.replace('.', '', 1).isdigit() else None
+            )
         if response.status_code != 200:
             raise RuntimeError(f"Jina API error: {response.status_code} {response.text}")
         data = response.json()
-        return [item["embedding"] for item in data["data"]]
-
-    def get_embeddings(self, texts):
-        # Batch if needed
-        results = []
-        for i in range(0, len(texts), self.batch_size):
-            batch = texts[i:i+self.batch_size]
-            results.extend(self._embed_batch(batch))
-        return results
-
-    def get_query_embedding(self, query):
-        return self.get_embeddings([query])[0] 
\ No newline at end of file
+        items = sorted(data["data"], key=lambda item: item.get("index", 0))
+        if embedding_type in ("binary", "ubinary"):
+            return unpack_binary_embeddings([item["embedding"] for item in items], embedding_type)
+        return decode_base64_embeddings([item["embedding"] for item in items])
+
+    def get_embeddings_array(self, texts, background=False, **options):
+        # Batches are formed by estimated tokens and paced by the scheduler;
+        # background (ingestion) calls leave part of the rate budget for search
+        batches = self.scheduler.run(texts, lambda batch: self._embed_batch(batch, **options), background=background)
+        if not batches:
+            return np.empty((0, 0), dtype=np.float32)
+        if len(batches) == 1:
+            return batches[0]
+        return np.concatenate(batches, axis=0)
+
+    def get_embeddings(self, texts, background=False, **options):
+        return self.get_embeddings_array(texts, background=background, **options).tolist()
+
+    def get_query_embedding(self, query, **options):
+        return self.get_embeddings_array([query], **options)[0].tolist()
+
+def decode_base64_embeddings(encoded):
+    """Decode base64 float32 embeddings into one (n, dim) array without per-float Python objects."""
+    raw = b"".join(base64.b64decode(item) for item in encoded)
+    return np.frombuffer(raw, dtype="<f4").reshape(len(encoded), -1)
+
+def unpack_binary_embeddings(packed, embedding_type):
+    """
+    Expand bit-packed embeddings (8 dimensions per byte) into an (n, dim) array of +1/-1.
+
+    Cosine similarity over +1/-1 vectors ranks like Hamming distance, and the
+    collection's binary quantization keeps only one bit per dimension in RAM.
+    """
+    values = np.asarray(packed, dtype=np.int16)
+    if embedding_type == "binary":
+        # Signed int8 packing is offset by 128 from the unsigned form
+        values = values + 128
+    bits = np.unpackbits(values.astype(np.uint8), axis=1)
+    return bits.astype(np.float32) * 2 - 1 
\ No newline at end of file
@@ -4,8 +4,8 @@ class OpenAIEmbeddingProvider(EmbeddingProvider):
     def __init__(self, config):
         super().__init__(config)
 
-    def get_embeddings(self, texts):
+    def get_embeddings(self, texts, **options):
         raise NotImplementedError("OpenAI embedding not implemented yet.")
 
-    def get_query_embedding(self, query):
+    def get_query_embedding(self, query, **options):
         raise NotImplementedError("OpenAI query embedding not implemented yet.") 
\ No newline at end of file
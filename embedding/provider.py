@@ -1,13 +1,23 @@
 from abc import ABC, abstractmethod
+import numpy as np
 
 class EmbeddingProvider(ABC):
     def __init__(self, config):
         self.config = config
 
     @abstractmethod
-    def get_embeddings(self, texts):
+    def get_embeddings(self, texts, **options):
+        """
+        Embed a list of texts. Providers may accept `dimensions`, `task` and
+        `embedding_type` options (see storage/collection_settings.py), and
+        `background=True` for low-priority ingestion work.
+        """
         pass
 
+    def get_embeddings_array(self, texts, **options):
+        """Embed texts into a contiguous (len(texts), dim) float32 array."""
+        return np.asarray(self.get_embeddings(texts, **options), dtype=np.float32)
+
     @abstractmethod
-    def get_query_embedding(self, query):
+    def get_query_embedding(self, query, **options):
         pass 
\ No newline at end of file
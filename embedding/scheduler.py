@@ -0,0 +1,201 @@
+import logging
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger("embedding.scheduler")
+
+# Rough chars-per-token ratio for English/BPE-style tokenizers; good enough for budgeting
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    return max(1, math.ceil(len(text) / CHARS_PER_TOKEN))
+
+
+class RateLimitError(RuntimeError):
+    """Provider rejected a request because of rate limits (HTTP 429)."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate_per_minute`."""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount=1, reserve=0.0):
+        """
+        Take `amount` tokens, blocking until available. `reserve` is the fraction of
+        capacity this caller must leave in the bucket (held back for higher-priority work).
+        """
+        held_back = reserve * self.capacity
+        # Requests larger than the bucket are let through once it is full
+        amount = min(amount, self.capacity - held_back)
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens - held_back >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount + held_back - self.tokens) / self.rate
+            time.sleep(min(wait, 1.0))
+
+    def drain(self):
+        """Empty the bucket, e.g. after the provider reported a 429."""
+        with self.lock:
+            self._refill()
+            self.tokens = 0.0
+
+
+class AIMDLimiter:
+    """
+    Concurrency limit with additive increase / multiplicative decrease.
+
+    Every fast success of a request that used all of its slots adds roughly one slot
+    per `limit` completions, so the limit only grows while it is actually being tested;
+    a 429 halves the limit and a response slower than `latency_target` shrinks it by 10%.
+    """
+
+    def __init__(self, max_limit, min_limit=1, initial=None, latency_target=None, reserve=0.0):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = float(initial or self.min_limit)
+        self.latency_target = latency_target
+        # Fraction of slots background callers may not take
+        self.reserve = reserve
+        self.in_flight = 0
+        self.last_decrease = 0.0
+        self.cond = threading.Condition()
+
+    def _slots(self, background):
+        limit = int(self.limit)
+        if background and self.reserve and limit > 1:
+            return max(1, limit - max(1, int(limit * self.reserve)))
+        return limit
+
+    def acquire(self, background=False):
+        """Take a slot; returns True if the caller took the last slot it may use (the limit is saturated)."""
+        with self.cond:
+            while self.in_flight >= self._slots(background):
+                self.cond.wait()
+            self.in_flight += 1
+            return self.in_flight >= self._slots(background)
+
+    def release(self):
+        with self.cond:
+            self.in_flight -= 1
+            self.cond.notify_all()
+
+    def _decrease(self, factor):
+        now = time.monotonic()
+        # Requests already in flight when the limit was hit report overload too; count one decrease per second
+        if now - self.last_decrease < 1.0:
+            return
+        self.last_decrease = now
+        self.limit = max(self.min_limit, self.limit * factor)
+        logger.info(f"Embedding concurrency decreased to {int(self.limit)}")
+
+    def on_success(self, latency, saturated=False):
+        with self.cond:
+            if self.latency_target and latency > self.latency_target:
+                self._decrease(0.9)
+            elif saturated:
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self.cond.notify_all()
+
+    def on_overload(self):
+        with self.cond:
+            self._decrease(0.5)
+
+
+class EmbeddingScheduler:
+    """
+    Forms embedding batches by estimated token count and dispatches them within the
+    provider's requests-per-minute / tokens-per-minute budget.
+
+    One scheduler is shared by every caller of a provider instance, so concurrent
+    ingestions and searches draw from the same rate-limit budget. Background work
+    (ingestion, reindex) cannot use the last `search_reserve` fraction of the rate
+    budget or of the concurrency slots, which stay available for search.
+    """
+
+    def __init__(self, max_batch_items=100, max_batch_tokens=50000, requests_per_minute=500,
+                 tokens_per_minute=1000000, max_concurrency=8, latency_target=10.0, max_retries=5,
+                 search_reserve=0.2):
+        self.max_batch_items = max_batch_items
+        self.max_batch_tokens = max_batch_tokens
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.limiter = AIMDLimiter(max_concurrency, initial=max(1, max_concurrency // 2), latency_target=latency_target,
+                                   reserve=search_reserve)
+        self.search_reserve = search_reserve
+        self.max_retries = max_retries
+
+    def make_batches(self, texts):
+        """Split texts into (start, end, estimated_tokens) ranges bounded by item count and token budget."""
+        batches = []
+        start, tokens = 0, 0
+        for i, text in enumerate(texts):
+            t = estimate_tokens(text)
+            if i > start and (i - start >= self.max_batch_items or tokens + t > self.max_batch_tokens):
+                batches.append((start, i, tokens))
+                start, tokens = i, 0
+            tokens += t
+        if start < len(texts):
+            batches.append((start, len(texts), tokens))
+        return batches
+
+    def _dispatch(self, fn, batch, tokens, background=False):
+        reserve = self.search_reserve if background else 0.0
+        attempt = 0
+        while True:
+            if self.request_bucket:
+                self.request_bucket.acquire(1, reserve=reserve)
+            if self.token_bucket:
+                self.token_bucket.acquire(tokens, reserve=reserve)
+            saturated = self.limiter.acquire(background=background)
+            started = time.monotonic()
+            try:
+                result = fn(batch)
+            except RateLimitError as e:
+                self.limiter.on_overload()
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                if self.request_bucket:
+                    self.request_bucket.drain()
+                delay = e.retry_after if e.retry_after is not None else min(60, 2 ** attempt)
+                logger.warning(f"Embedding rate limited (attempt {attempt}/{self.max_retries}), retrying in {delay}s")
+                time.sleep(delay)
+                continue
+            finally:
+                self.limiter.release()
+            self.limiter.on_success(time.monotonic() - started, saturated=saturated)
+            return result
+
+    def run(self, texts, fn, background=False):
+        """
+        Call `fn(batch_texts)` for every batch and return the per-batch results in input order.
+        `background=True` marks low-priority work that must leave the search reserve untouched.
+        """
+        batches = self.make_batches(texts)
+        if len(batches) <= 1:
+            return [self._dispatch(fn, texts[start:end], tokens, background) for start, end, tokens in batches]
+        with ThreadPoolExecutor(max_workers=min(len(batches), self.limiter.max_limit)) as executor:
+            futures = [executor.submit(self._dispatch, fn, texts[start:end], tokens, background)
+                       for start, end, tokens in batches]
+            return [f.result() for f in futures]
@@ -0,0 +1,162 @@
+"""
+Near-duplicate chunk detection with MinHash + LSH, run before embedding.
+
+Each chunk is reduced to word 3-gram shingles and a MinHash signature, split into
+LSH bands. Band keys are stored on every surviving point (payload field
+`dedup_bands`, keyword-indexed), so the collection itself is the LSH index:
+candidates are the chunks earlier in the same batch and the stored points that
+share at least one band key. A candidate is a duplicate if the exact Jaccard
+similarity of the shingle sets reaches the threshold.
+
+Modes:
+  off   every chunk is embedded and stored (default)
+  link  the duplicate is stored with a copy of the surviving point's vector and
+        `duplicate_of` in its payload, without being embedded again
+  drop  the duplicate is not embedded or stored. Its text cannot be recovered, so
+        only near-exact copies are dropped: the similarity must also reach
+        DEDUP_DROP_THRESHOLD and the differing tokens may not contain digits or
+        underscores (product codes, versions, identifiers)
+In link and drop mode the surviving point lists the duplicate's source in `duplicates`.
+"""
+import hashlib
+import logging
+import os
+import zlib
+
+import numpy as np
+
+from processing.sparse import tokenize
+
+logger = logging.getLogger("processing.dedup")
+
+DEDUP_MODES = {"off", "drop", "link"}
+DEDUP_MODE = os.getenv("DEDUP_MODE", "off")
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", 0.9))
+# Minimum similarity for a chunk to be dropped rather than linked
+DEDUP_DROP_THRESHOLD = float(os.getenv("DEDUP_DROP_THRESHOLD", 0.98))
+# Upper bound on stored points fetched as candidates for one batch
+DEDUP_MAX_CANDIDATES = int(os.getenv("DEDUP_MAX_CANDIDATES", 1000))
+
+BANDS_FIELD = "dedup_bands"
+NUM_PERM = 64
+# 8 bands of 8 rows: pairs above ~0.77 Jaccard almost always share a band
+BANDS = 8
+SHINGLE_SIZE = 3
+# Largest prime below 2**32; permutation products stay below 2**64
+_PRIME = np.uint64(4294967291)
+_rng = np.random.RandomState(20240601)  # fixed seed: band keys must match across processes and restarts
+_PERM_A = _rng.randint(1, 2 ** 32 - 5, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, 2 ** 32 - 5, size=NUM_PERM, dtype=np.uint64)
+
+# Chunk metadata copied into a duplicate's reference on the surviving point
+REFERENCE_KEYS = ("filename", "source_id", "source_path", "chunk_index")
+
+
+def shingles(tokens):
+    if len(tokens) < SHINGLE_SIZE:
+        return {" ".join(tokens)} if tokens else set()
+    return {" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+
+
+def minhash(shingle_set):
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingle_set), dtype=np.uint64,
+                         count=len(shingle_set))
+    # (NUM_PERM, n) matrix of permuted hashes, minimum per permutation
+    return ((_PERM_A[:, None] * hashes[None, :] + _PERM_B[:, None]) % _PRIME).min(axis=1)
+
+
+def band_keys(signature):
+    rows = NUM_PERM // BANDS
+    return [f"{band}:{hashlib.blake2b(signature[band * rows:(band + 1) * rows].tobytes(), digest_size=8).hexdigest()}"
+            for band in range(BANDS)]
+
+
+def has_identifier_changes(a, b):
+    """True if the tokens in only one of the token sets `a` and `b` include numbers or identifiers."""
+    return any(any(ch.isdigit() or ch == "_" for ch in token) for token in a ^ b)
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def reference(chunk):
+    meta = chunk.get("metadata") or {}
+    return {key: meta[key] for key in REFERENCE_KEYS if key in meta}
+
+
+class ChunkDeduplicator:
+    """Split chunk batches into unique chunks and near-duplicates of earlier chunks in the collection."""
+
+    def __init__(self, storage_manager, mode=DEDUP_MODE, threshold=DEDUP_THRESHOLD):
+        if mode not in DEDUP_MODES:
+            raise ValueError(f"Unknown dedup mode '{mode}', expected one of {sorted(DEDUP_MODES)}")
+        self.storage_manager = storage_manager
+        self.mode = mode
+        self.threshold = max(threshold, DEDUP_DROP_THRESHOLD) if mode == "drop" else threshold
+
+    def _is_duplicate(self, score, tokens, candidate_tokens):
+        if score < self.threshold:
+            return False
+        # A dropped chunk is gone for good: keep it if it differs in a code, number or identifier
+        return self.mode != "drop" or not has_identifier_changes(tokens, candidate_tokens)
+
+    def split(self, collection_name, chunks):
+        """
+        Tag every chunk in `chunks` (dicts with "id", "text", "metadata").
+
+        Unique chunks get "dedup_bands" (and "duplicates" for in-batch copies).
+        Returns [(chunk, survivor_id, survivor_in_batch)] for the duplicates, in order.
+        """
+        self.storage_manager.ensure_keyword_index(collection_name, BANDS_FIELD)
+        token_lists = [tokenize(chunk["text"]) for chunk in chunks]
+        shingle_sets = [shingles(tokens) for tokens in token_lists]
+        keys = [band_keys(minhash(s)) if s else [] for s in shingle_sets]
+        all_keys = sorted({key for chunk_keys in keys for key in chunk_keys})
+        stored = self.storage_manager.find_by_keywords(collection_name, BANDS_FIELD, all_keys,
+                                                       limit=DEDUP_MAX_CANDIDATES) if all_keys else []
+        # band key -> [(point id, shingle set, token set, chunk or None)]; stored points first so older points survive
+        index = {}
+        for record in stored:
+            record_tokens = tokenize((record.payload or {}).get("text", ""))
+            candidate = (record.id, shingles(record_tokens), set(record_tokens), None)
+            for key in (record.payload or {}).get(BANDS_FIELD, []):
+                index.setdefault(key, []).append(candidate)
+
+        duplicates = []
+        for chunk, tokens, shingle_set, chunk_keys in zip(chunks, token_lists, shingle_sets, keys):
+            token_set = set(tokens)
+            best, best_score = None, -1.0
+            seen = set()
+            for key in chunk_keys:
+                for candidate in index.get(key, []):
+                    if candidate[0] in seen:
+                        continue
+                    seen.add(candidate[0])
+                    score = jaccard(shingle_set, candidate[1])
+                    if score > best_score and self._is_duplicate(score, token_set, candidate[2]):
+                        best, best_score = candidate, score
+            if best is None:
+                chunk["dedup_bands"] = chunk_keys
+                for key in chunk_keys:
+                    index.setdefault(key, []).append((chunk["id"], shingle_set, token_set, chunk))
+                continue
+            survivor_id, _, _, survivor_chunk = best
+            if survivor_chunk is not None:
+                survivor_chunk.setdefault("duplicates", []).append(reference(chunk))
+            duplicates.append((chunk, survivor_id, survivor_chunk is not None))
+        if duplicates:
+            logger.info(f"{len(duplicates)} of {len(chunks)} chunks are near-duplicates in collection "
+                        f"'{collection_name}' (mode={self.mode})")
+        return duplicates
+
+    def record_stored_duplicates(self, collection_name, duplicates):
+        """Append references for duplicates of points written in earlier batches."""
+        references = {}
+        for chunk, survivor_id, survivor_in_batch in duplicates:
+            if not survivor_in_batch:
+                references.setdefault(survivor_id, []).append(reference(chunk))
+        for survivor_id, refs in references.items():
+            self.storage_manager.append_to_payload_list(collection_name, survivor_id, "duplicates", refs)
@@ -2,16 +2,121 @@ import uuid
 import logging
 import math
 import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from core.admission import ingestion_governor
 
 logger = logging.getLogger("processing.processor")
 
 class Processor:
-    def __init__(self, chunker, embedding_provider, storage_manager, embedding_batch_size=None):
+    def __init__(self, chunker, embedding_provider, storage_manager, embedding_batch_size=None, embedding_options=None,
+                 sparse_encoder=None, deduplicator=None, pipeline_depth=None):
         self.chunker = chunker
         self.embedding_provider = embedding_provider
         self.storage_manager = storage_manager
+        # Provider kwargs from the collection's settings (dimensions, task, embedding_type)
+        self.embedding_options = embedding_options or {}
+        # BM25 encoder for hybrid collections (processing/sparse.py); None for dense-only collections
+        self.sparse_encoder = sparse_encoder
+        # Near-duplicate filter run before embedding (processing/dedup.py); None embeds every chunk
+        self.deduplicator = deduplicator
         # Allow batch size override, else from env/config
         self.embedding_batch_size = embedding_batch_size or int(os.getenv("EMBEDDING_BATCH_SIZE", 100))
+        # Batches embedded and upserted concurrently per ingestion, so the embedding scheduler's adaptive
+        # concurrency limit has parallel requests to work with (ingestion_governor still caps the total)
+        self.pipeline_depth = max(1, pipeline_depth or int(os.getenv("INGEST_PIPELINE_DEPTH", 4)))
+
+    def _embed_texts(self, texts):
+        """Embed a batch as one contiguous (len(texts), dim) float32 array."""
+        # Ingestion is background work: it yields provider capacity to search
+        if hasattr(self.embedding_provider, "get_embeddings_array"):
+            return self.embedding_provider.get_embeddings_array(texts, background=True, **self.embedding_options)
+        if hasattr(self.embedding_provider, "get_embeddings"):
+            return np.asarray(self.embedding_provider.get_embeddings(texts, background=True, **self.embedding_options),
+                              dtype=np.float32)
+        return np.asarray([self.embedding_provider.get_query_embedding(text, **self.embedding_options) for text in texts],
+                          dtype=np.float32)
+
+    @staticmethod
+    def _build_payload(chunk):
+        chunk_meta = chunk["metadata"]
+        payload = {
+            "text": chunk["text"],
+            "metadata": chunk_meta
+        }
+        # Add filename at top-level for Qdrant filtering
+        if "filename" in chunk_meta:
+            payload["filename"] = chunk_meta["filename"]
+        # Deduplication bookkeeping, see processing/dedup.py
+        for key in ("dedup_bands", "duplicates", "duplicate_of"):
+            if chunk.get(key):
+                payload[key] = chunk[key]
+        return payload
+
+    def _upsert_chunks(self, collection_name, chunks, vectors):
+        """Upsert chunks with their embedding matrix; returns the new point ids."""
+        ids = [chunk.get("id") or str(uuid.uuid4()) for chunk in chunks]
+        payloads = [self._build_payload(chunk) for chunk in chunks]
+        sparse_vectors = None
+        if self.sparse_encoder is not None:
+            sparse_vectors = self.sparse_encoder.encode_documents([chunk["text"] for chunk in chunks])
+        self.storage_manager.upsert_batch(collection_name, ids, vectors, payloads, sparse_vectors=sparse_vectors)
+        return ids
+
+    def _store_chunks(self, collection_name, chunks):
+        """
+        Deduplicate, embed and upsert one batch of chunks.
+        Returns (ids of the points written, number of near-duplicate chunks).
+        """
+        # Stable point ids, so a retried batch overwrites whatever its failed attempt already wrote
+        for chunk in chunks:
+            chunk.setdefault("id", str(uuid.uuid4()))
+        if self.deduplicator is None:
+            vectors = self._embed_texts([chunk["text"] for chunk in chunks])
+            return self._upsert_chunks(collection_name, chunks, vectors), 0
+        for chunk in chunks:
+            for key in ("dedup_bands", "duplicates", "duplicate_of"):
+                chunk.pop(key, None)
+        duplicates = self.deduplicator.split(collection_name, chunks)
+        duplicate_chunks = {chunk["id"] for chunk, _, _ in duplicates}
+        unique = [chunk for chunk in chunks if chunk["id"] not in duplicate_chunks]
+        point_ids = []
+        vectors = None
+        if unique:
+            vectors = self._embed_texts([chunk["text"] for chunk in unique])
+            point_ids = self._upsert_chunks(collection_name, unique, vectors)
+        self.deduplicator.record_stored_duplicates(collection_name, duplicates)
+        if duplicates and self.deduplicator.mode == "link":
+            # Store duplicates under their own ids with the survivor's vector instead of embedding them
+            rows = {chunk["id"]: row for row, chunk in enumerate(unique)}
+            stored = self.storage_manager.get_dense_vectors(
+                collection_name, [survivor for _, survivor, in_batch in duplicates if not in_batch]
+            )
+            linked = [(chunk, vectors[rows[survivor]] if in_batch else stored.get(survivor), survivor)
+                      for chunk, survivor, in_batch in duplicates]
+            linked = [(chunk, vector, survivor) for chunk, vector, survivor in linked if vector is not None]
+            for chunk, _, survivor in linked:
+                chunk["duplicate_of"] = survivor
+            if linked:
+                point_ids.extend(self._upsert_chunks(
+                    collection_name, [chunk for chunk, _, _ in linked],
+                    np.asarray([vector for _, vector, _ in linked], dtype=np.float32)
+                ))
+        return point_ids, len(duplicates)
+
+    def _store_batch(self, collection_name, chunks, attempts=2):
+        """Store one batch through the ingestion gate, retrying a failed batch once."""
+        for attempt in range(1, attempts + 1):
+            try:
+                # Waits while search is over its latency SLO and caps concurrent ingestion batches
+                with ingestion_governor.batch():
+                    return self._store_chunks(collection_name, chunks)
+            except Exception as e:
+                if attempt == attempts:
+                    raise
+                logger.warning(f"Batch of {len(chunks)} chunks failed for collection '{collection_name}' "
+                               f"(attempt {attempt}/{attempts}), retrying: {e}")
 
     def process_document(self, document, metadata=None, progress_callback=None):
         collection_name = metadata.get("collection_name") if metadata else "content_library"
@@ -22,35 +127,14 @@ class Processor:
         file_info = f"File '{filename}': " if filename else ""
         logger.info(f"{file_info}Document split into {len(chunks)} chunks for collection '{collection_name}'")
         total_chunks = len(chunks)
-        points = []
-        # 2. Batch embedding and upsert
-        for start in range(0, total_chunks, self.embedding_batch_size):
-            end = min(start + self.embedding_batch_size, total_chunks)
-            batch_chunks = chunks[start:end]
-            batch_texts = [chunk["text"] for chunk in batch_chunks]
-            # Batch embedding (assume provider supports it, else fallback)
-            if hasattr(self.embedding_provider, "get_query_embedding_batch"):
-                batch_vectors = self.embedding_provider.get_query_embedding_batch(batch_texts)
-            else:
-                batch_vectors = [self.embedding_provider.get_query_embedding(text) for text in batch_texts]
-            for i, (chunk, vector) in enumerate(zip(batch_chunks, batch_vectors)):
-                chunk_meta = chunk["metadata"]
-                point_id = str(uuid.uuid4())
-                payload = {
-                    "text": chunk["text"],
-                    "metadata": chunk_meta
-                }
-                # Add filename at top-level for Qdrant filtering
-                if "filename" in chunk_meta:
-                    payload["filename"] = chunk_meta["filename"]
-                points.append({
-                    "id": point_id,
-                    "vector": vector,
-                    "payload": payload
-                })
-            # Upsert this batch
-            logger.info(f"{file_info}Upserting batch {start+1}-{end} of {total_chunks} to collection '{collection_name}'...")
-            self.storage_manager.upsert_vectors(collection_name, points[-len(batch_chunks):])
+        point_ids = []
+        # 2. Batch embedding and upsert, up to pipeline_depth batches at a time
+        in_flight = deque()
+
+        def complete_oldest():
+            future, end = in_flight.popleft()
+            batch_ids, _ = future.result()
+            point_ids.extend(batch_ids)
             # Progress callback
             if progress_callback:
                 progress_callback({
@@ -58,7 +142,151 @@ class Processor:
                     "total": total_chunks,
                     "percent": round(100*end/total_chunks, 1)
                 })
-        logger.info(f"{file_info}Ingestion complete: {len(points)} chunks upserted to collection '{collection_name}'")
+
+        with ThreadPoolExecutor(max_workers=self.pipeline_depth) as executor:
+            for start in range(0, total_chunks, self.embedding_batch_size):
+                end = min(start + self.embedding_batch_size, total_chunks)
+                logger.info(f"{file_info}Upserting batch {start+1}-{end} of {total_chunks} to collection '{collection_name}'...")
+                in_flight.append((executor.submit(self._store_batch, collection_name, chunks[start:end]), end))
+                if len(in_flight) >= self.pipeline_depth:
+                    complete_oldest()
+            while in_flight:
+                complete_oldest()
+        logger.info(f"{file_info}Ingestion complete: {len(point_ids)} chunks upserted to collection '{collection_name}'")
         if progress_callback:
             progress_callback({"processed": total_chunks, "total": total_chunks, "percent": 100, "done": True})
-        return {"chunks": len(points), "collection": collection_name, "point_ids": [p["id"] for p in points]}
\ No newline at end of file
+        return {"chunks": len(point_ids), "collection": collection_name, "point_ids": point_ids}
+
+    def process_documents(self, documents, collection_name="content_library", files_total=None,
+                          progress_callback=None):
+        """
+        Ingest many documents into one collection, packing chunks from different
+        documents into full embedding/upsert batches.
+
+        `documents` is an iterable of dicts with "name" and either "text" (plus
+        optional "metadata") or "error" for files that could not be read. It is
+        consumed lazily, so archives can be streamed member by member.
+        Returns per-file accounting: {name: {"status", "chunks", "processed", "error"?}}. A batch
+        that fails twice marks its files "error", or "partial" if some of their chunks were
+        stored ("processed" counts the stored chunks).
+        """
+        files = {}
+        pending = []  # (file name, chunk) tuples waiting for a full batch
+        stats = {"processed": 0, "total": 0, "files_done": 0, "files_failed": 0, "duplicates": 0}
+        changed = set()  # files whose accounting changed since the last progress report
+
+        def report(done=False):
+            if not progress_callback:
+                return
+            finished = stats["files_done"] + stats["files_failed"]
+            denominator = files_total or len(files) or 1
+            progress_callback({
+                "processed": stats["processed"],
+                "total": stats["total"],
+                "files_total": files_total if files_total is not None else len(files),
+                "files_done": stats["files_done"],
+                "files_failed": stats["files_failed"],
+                "duplicates": stats["duplicates"],
+                "percent": 100 if done else round(100 * finished / denominator, 1),
+                # Only send files that changed, so reports stay cheap for very large uploads
+                "files": {name: dict(files[name]) for name in changed},
+                "done": done
+            })
+            changed.clear()
+
+        def finish_file(name):
+            info = files[name]
+            if info["status"] == "chunked" and info["processed"] == info["chunks"]:
+                info["status"] = "done"
+                stats["files_done"] += 1
+            changed.add(name)
+
+        def fail_file(name, error):
+            info = files[name]
+            if info["status"] not in ("error", "partial"):
+                # Chunks from earlier batches stay stored: report how many ("processed") instead of hiding them
+                info["status"] = "partial" if info["processed"] else "error"
+                info["error"] = error
+                stats["files_failed"] += 1
+            changed.add(name)
+
+        in_flight = deque()  # (future, batch) in submission order, at most pipeline_depth
+
+        def complete_oldest():
+            future, batch = in_flight.popleft()
+            try:
+                _, duplicates = future.result()
+            except Exception as e:
+                logger.error(f"Batch of {len(batch)} chunks failed for collection '{collection_name}': {e}", exc_info=True)
+                for name in {name for name, _ in batch}:
+                    fail_file(name, str(e))
+                return
+            stats["processed"] += len(batch)
+            stats["duplicates"] += duplicates
+            touched = []
+            for name, _ in batch:
+                files[name]["processed"] += 1
+                if files[name]["status"] == "error":
+                    # A batch submitted before the file's failing batch completed
+                    files[name]["status"] = "partial"
+                if name not in touched:
+                    touched.append(name)
+            for name in touched:
+                finish_file(name)
+            logger.info(f"Upserted batch of {len(batch)} chunks from {len(touched)} file(s) to collection '{collection_name}' "
+                        f"({stats['processed']} chunks so far)")
+            report()
+
+        def flush(batch):
+            # Drop remaining chunks of files that already failed in an earlier batch
+            batch = [(name, chunk) for name, chunk in batch if files[name]["status"] not in ("error", "partial")]
+            if not batch:
+                return
+            in_flight.append((executor.submit(self._store_batch, collection_name, [chunk for _, chunk in batch]), batch))
+            if len(in_flight) >= self.pipeline_depth:
+                complete_oldest()
+
+        # Near-duplicates between batches in flight at the same time are not detected by the deduplicator
+        with ThreadPoolExecutor(max_workers=self.pipeline_depth) as executor:
+            for document in documents:
+                name = document["name"]
+                # Disambiguate repeated names (e.g. same file name in different archive folders)
+                if name in files:
+                    suffix = 2
+                    while f"{name} ({suffix})" in files:
+                        suffix += 1
+                    name = f"{name} ({suffix})"
+                files[name] = {"status": "pending", "chunks": 0, "processed": 0}
+                if "error" in document:
+                    fail_file(name, document["error"])
+                    report()
+                    continue
+                meta = dict(document.get("metadata") or {})
+                meta.setdefault("filename", name)
+                try:
+                    chunks = self.chunker.chunk(document["text"], metadata=meta)
+                except Exception as e:
+                    fail_file(name, str(e))
+                    report()
+                    continue
+                files[name]["chunks"] = len(chunks)
+                files[name]["status"] = "chunked"
+                changed.add(name)
+                stats["total"] += len(chunks)
+                if not chunks:
+                    finish_file(name)
+                    report()
+                    continue
+                pending.extend((name, chunk) for chunk in chunks)
+                while len(pending) >= self.embedding_batch_size:
+                    flush(pending[:self.embedding_batch_size])
+                    pending = pending[self.embedding_batch_size:]
+            if pending:
+                flush(pending)
+            while in_flight:
+                complete_oldest()
+        logger.info(f"Multi-file ingestion complete for collection '{collection_name}': "
+                    f"{stats['files_done']} file(s) ingested, {stats['files_failed']} failed, "
+                    f"{stats['processed']} chunks upserted")
+        report(done=True)
+        return files
@@ -0,0 +1,160 @@
+import json
+import logging
+import os
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from core.admission import ingestion_governor
+from embedding.scheduler import TokenBucket
+
+logger = logging.getLogger("processing.reindexer")
+
+
+def shadow_collection_name(alias):
+    return f"{alias}__{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}_{uuid.uuid4().hex[:6]}"
+
+
+def checkpoint_path(alias, checkpoint_dir=None):
+    return os.path.join(checkpoint_dir or os.getenv("CHECKPOINT_DIR", "embedding_checkpoints"), f"reindex_{alias}.json")
+
+
+def load_checkpoint(alias, checkpoint_dir=None):
+    path = checkpoint_path(alias, checkpoint_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+class Reindexer:
+    """
+    Re-embed a collection into a shadow collection, then atomically repoint the alias.
+
+    Stored `text` payloads are scrolled from the source in pages, embedded with the
+    new provider/options and upserted to the shadow collection under the same point
+    ids. With a `sparse_encoder` the shadow collection is hybrid and BM25 vectors are
+    recomputed from the same text. Search keeps using the old collection until the alias swap. Progress is
+    checkpointed after every contiguous completed page, so a restarted job resumes
+    from there.
+    """
+
+    def __init__(self, storage_manager, embedding_provider, embedding_options=None, batch_size=256, parallel=2,
+                 max_points_per_minute=None, checkpoint_dir=None, sparse_encoder=None):
+        self.storage_manager = storage_manager
+        self.embedding_provider = embedding_provider
+        self.embedding_options = embedding_options or {}
+        self.batch_size = batch_size
+        self.parallel = max(1, parallel)
+        # Throttle so a reindex cannot use the whole embedding budget that live search also needs
+        self.throttle = TokenBucket(max_points_per_minute, capacity=batch_size) if max_points_per_minute else None
+        self.checkpoint_dir = checkpoint_dir or os.getenv("CHECKPOINT_DIR", "embedding_checkpoints")
+        self.sparse_encoder = sparse_encoder
+
+    def _save_checkpoint(self, alias, checkpoint):
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        path = checkpoint_path(alias, self.checkpoint_dir)
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(checkpoint, f, indent=2)
+        os.replace(f"{path}.tmp", path)
+
+    def _reembed_page(self, target, records):
+        records = [r for r in records if (r.payload or {}).get("text")]
+        if not records:
+            return 0
+        texts = [r.payload["text"] for r in records]
+        with ingestion_governor.batch():
+            vectors = self.embedding_provider.get_embeddings_array(texts, background=True, **self.embedding_options)
+            sparse_vectors = self.sparse_encoder.encode_documents(texts) if self.sparse_encoder else None
+            self.storage_manager.upsert_batch(target, [r.id for r in records], vectors, [r.payload for r in records],
+                                              sparse_vectors=sparse_vectors)
+        return len(records)
+
+    def run(self, alias, target, vector_size, distance="cosine", binary_quantization=False, sparse_vectors=False,
+            delete_old=False, progress_callback=None):
+        """
+        Reindex `alias` (an alias or a plain collection name) into `target` and swap the alias.
+
+        Returns the final checkpoint dict. The old collection is only deleted with `delete_old`:
+        an old collection behind an existing alias is dropped after the swap, and a plain
+        collection named `alias` (which Qdrant cannot hold next to an alias of the same name)
+        is deleted at swap time. Without `delete_old` a plain collection cannot be reindexed.
+
+        Before the swap the target must hold every source point with text; otherwise the
+        checkpoint is reset so a re-run copies the source again into the same target.
+        """
+        if not delete_old and self.storage_manager.is_plain_collection(alias):
+            raise ValueError(f"'{alias}' is a plain collection; its first reindex deletes it to create the alias "
+                             f"of the same name, which requires delete_old")
+        checkpoint = load_checkpoint(alias, self.checkpoint_dir)
+        if checkpoint and not checkpoint.get("complete") and checkpoint["target"] == target:
+            logger.info(f"Resuming reindex of '{alias}' into '{target}' at {checkpoint['processed']} points")
+        else:
+            source = self.storage_manager.resolve_collection(alias)
+            checkpoint = {
+                "alias": alias,
+                "source": source,
+                "target": target,
+                "total": self.storage_manager.count(source),
+                "processed": 0,
+                "skipped": 0,
+                "next_offset": None,
+                "complete": False
+            }
+            self._save_checkpoint(alias, checkpoint)
+        source = checkpoint["source"]
+        if not self.storage_manager.collection_exists(target):
+            self.storage_manager.create_collection(
+                collection_name=target, vector_size=vector_size, distance=distance,
+                binary_quantization=binary_quantization, sparse_vectors=sparse_vectors
+            )
+
+        in_flight = deque()
+
+        def complete_oldest():
+            future, page_size, next_offset = in_flight.popleft()
+            written = future.result()
+            checkpoint["processed"] += page_size
+            checkpoint["skipped"] += page_size - written
+            checkpoint["next_offset"] = next_offset
+            self._save_checkpoint(alias, checkpoint)
+            if progress_callback:
+                total = checkpoint["total"] or 1
+                progress_callback({"processed": checkpoint["processed"], "total": checkpoint["total"],
+                                   "percent": min(100.0, round(100 * checkpoint["processed"] / total, 1))})
+
+        offset = checkpoint["next_offset"]
+        # A completed scroll with next_offset None is recorded as processed > 0
+        finished = checkpoint["processed"] > 0 and offset is None
+        with ThreadPoolExecutor(max_workers=self.parallel) as executor:
+            while not finished:
+                records, next_offset = self.storage_manager.scroll(source, limit=self.batch_size, offset=offset,
+                                                                   with_vectors=False)
+                if self.throttle and records:
+                    self.throttle.acquire(len(records))
+                in_flight.append((executor.submit(self._reembed_page, target, records), len(records), next_offset))
+                if len(in_flight) >= self.parallel:
+                    complete_oldest()
+                offset = next_offset
+                finished = next_offset is None
+            while in_flight:
+                complete_oldest()
+
+        expected = self.storage_manager.count(source) - checkpoint["skipped"]
+        written = self.storage_manager.count(target)
+        if written != expected:
+            # Points were written to or removed from the source behind the scroll: copy it again before swapping
+            checkpoint.update({"total": self.storage_manager.count(source), "processed": 0, "skipped": 0,
+                               "next_offset": None})
+            self._save_checkpoint(alias, checkpoint)
+            raise RuntimeError(f"Reindex target '{target}' has {written} points, expected {expected}; "
+                               f"re-run the reindex to copy '{source}' again")
+        self.storage_manager.swap_alias(alias, target, replace_collection=delete_old)
+        logger.info(f"Alias '{alias}' now points to '{target}' (was '{source}')")
+        if delete_old and source not in (alias, target):
+            self.storage_manager.delete_collection(source)
+            logger.info(f"Deleted old collection '{source}'")
+        checkpoint["complete"] = True
+        self._save_checkpoint(alias, checkpoint)
+        return checkpoint
@@ -0,0 +1,91 @@
+"""
+Locally computed BM25 sparse vectors for hybrid (dense + keyword) search.
+
+Terms are lower-cased word tokens hashed to 32-bit indices, so no vocabulary has
+to be stored or shared. Document vectors carry the BM25 term-frequency part
+    tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avg_length))
+and query vectors weight each distinct term 1.0. The IDF part is applied by Qdrant
+(sparse vector modifier "idf"), which keeps document frequencies up to date as
+points are written. The average chunk length comes from running corpus counts kept
+in the collection settings.
+"""
+import os
+import re
+import threading
+import zlib
+from collections import Counter
+
+BM25_K1 = float(os.getenv("BM25_K1", 1.2))
+BM25_B = float(os.getenv("BM25_B", 0.75))
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def term_index(term):
+    return zlib.crc32(term.encode("utf-8"))
+
+
+class CorpusStats:
+    """Running chunk and token counts of a collection, persisted through CollectionSettingsStore."""
+
+    def __init__(self, settings_store=None, collection_name=None):
+        self.settings_store = settings_store
+        self.collection_name = collection_name
+        stats = settings_store.get(collection_name).get("bm25_stats", {}) if settings_store else {}
+        self.documents = stats.get("documents", 0)
+        self.tokens = stats.get("tokens", 0)
+        self.lock = threading.Lock()
+
+    def average_length(self, documents=0, tokens=0):
+        """Average chunk length including a batch of `documents` chunks / `tokens` tokens not yet counted."""
+        with self.lock:
+            total_documents = self.documents + documents
+            return (self.tokens + tokens) / total_documents if total_documents else 1.0
+
+    def add(self, documents, tokens):
+        with self.lock:
+            self.documents += documents
+            self.tokens += tokens
+        if self.settings_store:
+            self.settings_store.add_corpus_stats(self.collection_name, documents, tokens)
+
+
+class BM25Encoder:
+    """Encode chunks and queries as {"indices", "values"} sparse vectors."""
+
+    def __init__(self, corpus_stats=None, k1=BM25_K1, b=BM25_B):
+        self.corpus_stats = corpus_stats or CorpusStats()
+        self.k1 = k1
+        self.b = b
+
+    @staticmethod
+    def _term_counts(tokens):
+        counts = Counter()
+        for term in tokens:
+            counts[term_index(term)] += 1
+        return counts
+
+    def encode_documents(self, texts):
+        """Encode a batch of chunks and add them to the corpus counts."""
+        token_lists = [tokenize(text) for text in texts]
+        batch_tokens = sum(len(tokens) for tokens in token_lists)
+        avg_length = self.corpus_stats.average_length(len(texts), batch_tokens) or 1.0
+        vectors = []
+        for tokens in token_lists:
+            norm = self.k1 * (1 - self.b + self.b * len(tokens) / avg_length)
+            counts = self._term_counts(tokens)
+            indices = list(counts)
+            vectors.append({
+                "indices": indices,
+                "values": [counts[i] * (self.k1 + 1) / (counts[i] + norm) for i in indices]
+            })
+        self.corpus_stats.add(len(texts), batch_tokens)
+        return vectors
+
+    def encode_query(self, text):
+        indices = list(self._term_counts(tokenize(text)))
+        return {"indices": indices, "values": [1.0] * len(indices)}
@@ -1,22 +1,39 @@
+from core.profiling import stage
+
+
 class Retriever:
     def __init__(self, embedding_provider, reranker_provider, storage_manager):
         self.embedding_provider = embedding_provider
         self.reranker_provider = reranker_provider
         self.storage_manager = storage_manager
 
-    def search(self, query, limit=10, use_expansion=True, collection_name="content_library", filter=None):
+    def search(self, query, limit=10, use_expansion=True, collection_name="content_library", filter=None,
+               embedding_options=None, query_vector=None, sparse_encoder=None):
         import logging
         logger = logging.getLogger("Retriever")
         try:
             logger.info(f"Searching for query: {query} in collection: {collection_name}")
-            query_vector = self.embedding_provider.get_query_embedding(query)
+            if query_vector is None:
+                with stage("query_embedding"):
+                    query_vector = self.embedding_provider.get_query_embedding(query, **(embedding_options or {}))
             logger.info(f"Query embedding shape: {len(query_vector)}")
-            results = self.storage_manager.search(
-                collection_name=collection_name,
-                query_vector=query_vector,
-                limit=limit,
-                filter=filter
-            )
+            with stage("qdrant_search"):
+                if sparse_encoder is not None:
+                    # Hybrid collection: exact-term BM25 matches are fused with the dense results
+                    results = self.storage_manager.hybrid_search(
+                        collection_name=collection_name,
+                        query_vector=query_vector,
+                        sparse_vector=sparse_encoder.encode_query(query),
+                        limit=limit,
+                        filter=filter
+                    )
+                else:
+                    results = self.storage_manager.search(
+                        collection_name=collection_name,
+                        query_vector=query_vector,
+                        limit=limit,
+                        filter=filter
+                    )
             logger.info(f"Search results: {results}")
             # Return results as a list of dicts (for API response)
             return results
@@ -0,0 +1,100 @@
+import os
+import threading
+import numpy as np
+
+
+class _CollectionCache:
+    def __init__(self, capacity, dim):
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.param_keys = np.zeros(capacity, dtype=np.int64)
+        self.last_used = np.zeros(capacity, dtype=np.int64)
+        self.values = [None] * capacity
+        self.size = 0
+
+
+class SemanticCache:
+    """
+    Near-duplicate query cache in front of the search pipeline.
+
+    Per collection it keeps a fixed-size matrix of normalized query embeddings.
+    A lookup is one matrix-vector product: the most similar cached query with the
+    same search parameters is a hit if its cosine similarity reaches `threshold`.
+    Entries are evicted least-recently-used, and a collection's entries are dropped
+    whenever it is written to (see QdrantManager.add_write_listener). Each drop bumps
+    the collection's generation; a result computed before a write is not stored after it.
+    """
+
+    def __init__(self, capacity=None, threshold=None):
+        self.capacity = capacity or int(os.getenv("SEMANTIC_CACHE_SIZE", 512))
+        self.threshold = threshold or float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.95))
+        self.lock = threading.Lock()
+        self.collections = {}
+        self.generations = {}
+        self.clock = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(vector):
+        v = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    def generation(self, collection_name):
+        """Current generation of a collection; pass it to `store` for results computed from now on."""
+        with self.lock:
+            return self.generations.get(collection_name, 0)
+
+    def lookup(self, collection_name, query_vector, params_key):
+        """Return the cached value for the closest matching query, or None."""
+        v = self._normalize(query_vector)
+        with self.lock:
+            cache = self.collections.get(collection_name)
+            if cache is None or cache.size == 0 or cache.vectors.shape[1] != v.shape[0]:
+                self.misses += 1
+                return None
+            n = cache.size
+            sims = cache.vectors[:n] @ v
+            sims[cache.param_keys[:n] != params_key] = -1.0
+            best = int(np.argmax(sims))
+            if sims[best] < self.threshold:
+                self.misses += 1
+                return None
+            self.clock += 1
+            cache.last_used[best] = self.clock
+            self.hits += 1
+            return cache.values[best]
+
+    def store(self, collection_name, query_vector, params_key, value, generation=None):
+        """Cache `value`; skipped if the collection was invalidated since `generation` was read."""
+        v = self._normalize(query_vector)
+        with self.lock:
+            if generation is not None and generation != self.generations.get(collection_name, 0):
+                return
+            cache = self.collections.get(collection_name)
+            if cache is None or cache.vectors.shape[1] != v.shape[0]:
+                cache = self.collections[collection_name] = _CollectionCache(self.capacity, v.shape[0])
+            if cache.size < self.capacity:
+                slot = cache.size
+                cache.size += 1
+            else:
+                slot = int(np.argmin(cache.last_used))
+            self.clock += 1
+            cache.vectors[slot] = v
+            cache.param_keys[slot] = params_key
+            cache.last_used[slot] = self.clock
+            cache.values[slot] = value
+
+    def invalidate(self, collection_name):
+        with self.lock:
+            self.collections.pop(collection_name, None)
+            self.generations[collection_name] = self.generations.get(collection_name, 0) + 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "threshold": self.threshold,
+                "entries": {name: cache.size for name, cache in self.collections.items()},
+            }
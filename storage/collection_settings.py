@@ -0,0 +1,114 @@
+import json
+import os
+import threading
+
+# Task values understood by jina-embeddings-v3. "retrieval" is asymmetric: passages are
+# embedded with "retrieval.passage" at ingest time and queries with "retrieval.query".
+EMBEDDING_TASKS = {"retrieval", "text-matching", "classification", "separation"}
+EMBEDDING_TYPES = {"float", "binary", "ubinary"}
+
+
+class CollectionSettingsStore:
+    """
+    Per-collection embedding settings persisted as a small JSON file.
+
+    Qdrant only records vector size and distance, so the embedding parameters a
+    collection was built with (output dimensions, task, embedding type) live here.
+    Collections without an entry use the provider defaults.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv("COLLECTION_SETTINGS_PATH", "data/collection_settings.json")
+        self.lock = threading.Lock()
+        self._settings = self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, "r") as f:
+            return json.load(f)
+
+    def _save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._settings, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def get(self, collection_name):
+        with self.lock:
+            return dict(self._settings.get(collection_name, {}))
+
+    def set(self, collection_name, settings):
+        with self.lock:
+            self._settings[collection_name] = {k: v for k, v in settings.items() if v is not None}
+            self._save()
+
+    def add_corpus_stats(self, collection_name, documents, tokens):
+        """Add to a collection's running BM25 counts (chunks and tokens ingested), see processing/sparse.py."""
+        with self.lock:
+            settings = self._settings.setdefault(collection_name, {})
+            stats = settings.setdefault("bm25_stats", {"documents": 0, "tokens": 0})
+            stats["documents"] += documents
+            stats["tokens"] += tokens
+            self._save()
+
+    def delete(self, collection_name):
+        with self.lock:
+            if self._settings.pop(collection_name, None) is not None:
+                self._save()
+
+
+def validate_settings(vector_size, embedding_dimensions=None, embedding_task=None, embedding_type=None):
+    """
+    Raise ValueError if the embedding settings cannot produce vectors of `vector_size`.
+    With `vector_size` None (not known yet) only task and type are checked.
+    """
+    if embedding_task is not None and embedding_task not in EMBEDDING_TASKS:
+        raise ValueError(f"Unknown embedding_task '{embedding_task}', expected one of {sorted(EMBEDDING_TASKS)}")
+    if embedding_type is not None and embedding_type not in EMBEDDING_TYPES:
+        raise ValueError(f"Unknown embedding_type '{embedding_type}', expected one of {sorted(EMBEDDING_TYPES)}")
+    if vector_size is None:
+        return
+    if embedding_dimensions is not None and embedding_dimensions != vector_size:
+        raise ValueError(
+            f"embedding_dimensions ({embedding_dimensions}) does not match collection vector_size ({vector_size})"
+        )
+    if embedding_type in ("binary", "ubinary") and vector_size % 8 != 0:
+        raise ValueError(f"Binary embeddings need a vector_size divisible by 8, got {vector_size}")
+
+
+def embedding_options(settings, role):
+    """
+    Translate stored collection settings into provider keyword arguments.
+
+    `role` is "passage" for ingestion and "query" for search. The compact embedding type
+    only applies to passages: queries stay float, and Qdrant compares them with the
+    binary-quantized stored vectors without losing their precision.
+    """
+    options = {}
+    if settings.get("embedding_dimensions"):
+        options["dimensions"] = settings["embedding_dimensions"]
+    task = settings.get("embedding_task")
+    if task == "retrieval":
+        options["task"] = f"retrieval.{role}"
+    elif task:
+        options["task"] = task
+    if role == "passage" and settings.get("embedding_type") and settings["embedding_type"] != "float":
+        options["embedding_type"] = settings["embedding_type"]
+    return options
+
+
+def check_vector_size(storage_manager, collection_name, settings):
+    """Raise ValueError if the Qdrant collection's vector size disagrees with its stored settings."""
+    dimensions = settings.get("embedding_dimensions")
+    if not dimensions:
+        return
+    vector_size = storage_manager.get_vector_size(collection_name)
+    if vector_size is not None and vector_size != dimensions:
+        raise ValueError(
+            f"Collection '{collection_name}' has vector_size {vector_size} but its embedding settings "
+            f"produce {dimensions}-d vectors"
+        )
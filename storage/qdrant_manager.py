@@ -1,13 +1,47 @@
+import os
+import time
+
+# How long alias -> collection lookups are cached; swaps made through this manager clear it immediately
+ALIAS_CACHE_TTL = 10.0
+# Named sparse vector holding BM25 term weights in hybrid collections (the dense vector stays unnamed)
+SPARSE_VECTOR_NAME = "bm25"
+# Candidates taken from each of the dense and sparse searches before rank fusion
+HYBRID_PREFETCH_LIMIT = int(os.getenv("HYBRID_PREFETCH_LIMIT", 50))
+
 class QdrantManager:
     def __init__(self, client):
         self.client = client
+        self._aliases = None
+        self._aliases_loaded = 0.0
+        self._write_listeners = []
+        self._payload_indexes = set()
+
+    def add_write_listener(self, listener):
+        """Register `listener(collection_name)`, called after any write to a collection (resolved through aliases)."""
+        self._write_listeners.append(listener)
 
-    def create_collection(self, collection_name, vector_size=1024, distance="cosine"):
-        from qdrant_client.models import VectorParams, Distance
+    def _notify_write(self, *names):
+        for name in names:
+            collection_name = self.resolve_collection(name)
+            for listener in self._write_listeners:
+                listener(collection_name)
+
+    def create_collection(self, collection_name, vector_size=1024, distance="cosine", binary_quantization=False,
+                          sparse_vectors=False):
+        from qdrant_client.models import (
+            VectorParams, Distance, BinaryQuantization, BinaryQuantizationConfig, SparseVectorParams, Modifier
+        )
         dist = getattr(Distance, distance.upper(), Distance.COSINE)
+        quantization_config = None
+        if binary_quantization:
+            # Keep 1-bit codes in RAM and the original vectors on disk
+            quantization_config = BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
         return self.client.create_collection(
             collection_name=collection_name,
-            vectors_config=VectorParams(size=vector_size, distance=dist)
+            vectors_config=VectorParams(size=vector_size, distance=dist, on_disk=binary_quantization or None),
+            quantization_config=quantization_config,
+            # Qdrant applies IDF to the sparse vector at query time from live document frequencies
+            sparse_vectors_config={SPARSE_VECTOR_NAME: SparseVectorParams(modifier=Modifier.IDF)} if sparse_vectors else None
         )
 
     def list_collections(self):
@@ -16,8 +50,131 @@ class QdrantManager:
     def get_collection(self, collection_name):
         return self.client.get_collection(collection_name=collection_name)
 
+    def get_vector_size(self, collection_name):
+        # Size of the default (unnamed) dense vector, or None for named-vector collections
+        vectors = self.client.get_collection(collection_name=collection_name).config.params.vectors
+        return getattr(vectors, "size", None)
+
+    def get_distance(self, collection_name):
+        vectors = self.client.get_collection(collection_name=collection_name).config.params.vectors
+        distance = getattr(vectors, "distance", None)
+        return getattr(distance, "value", distance)
+
+    def has_sparse_vectors(self, collection_name):
+        sparse = self.client.get_collection(collection_name=collection_name).config.params.sparse_vectors
+        return bool(sparse) and SPARSE_VECTOR_NAME in sparse
+
+    def collection_exists(self, collection_name):
+        return self.client.collection_exists(collection_name=collection_name)
+
+    def count(self, collection_name):
+        return self.client.count(collection_name=collection_name, exact=True).count
+
+    def scroll(self, collection_name, limit=256, offset=None, with_vectors=True):
+        """Return (records, next_offset) for one page of points ordered by id."""
+        return self.client.scroll(
+            collection_name=collection_name,
+            limit=limit,
+            offset=offset,
+            with_payload=True,
+            with_vectors=with_vectors
+        )
+
+    def ensure_keyword_index(self, collection_name, field_name):
+        """Create a keyword payload index on `field_name` once per collection (no-op if it already exists)."""
+        collection_name = self.resolve_collection(collection_name)
+        if (collection_name, field_name) in self._payload_indexes:
+            return
+        from qdrant_client.models import PayloadSchemaType
+        self.client.create_payload_index(collection_name=collection_name, field_name=field_name,
+                                         field_schema=PayloadSchemaType.KEYWORD)
+        self._payload_indexes.add((collection_name, field_name))
+
+    def find_by_keywords(self, collection_name, field_name, values, limit=1000):
+        """Points whose keyword (list) field `field_name` contains any of `values`, with payloads."""
+        from qdrant_client.models import Filter, FieldCondition, MatchAny
+        records, _ = self.client.scroll(
+            collection_name=collection_name,
+            scroll_filter=Filter(must=[FieldCondition(key=field_name, match=MatchAny(any=list(values)))]),
+            limit=limit,
+            with_payload=True,
+            with_vectors=False
+        )
+        return records
+
+    def get_dense_vectors(self, collection_name, ids):
+        """Return {id: dense vector} for the given point ids."""
+        records = self.client.retrieve(collection_name=collection_name, ids=ids, with_vectors=True)
+        return {r.id: r.vector[""] if isinstance(r.vector, dict) else r.vector for r in records}
+
+    def append_to_payload_list(self, collection_name, point_id, key, items):
+        """Extend the list payload field `key` of one point (read-modify-write)."""
+        records = self.client.retrieve(collection_name=collection_name, ids=[point_id], with_payload=[key])
+        if not records:
+            return
+        current = (records[0].payload or {}).get(key) or []
+        self.client.set_payload(collection_name=collection_name, payload={key: current + list(items)},
+                                points=[point_id], wait=True)
+        self._notify_write(collection_name)
+
+    def get_aliases(self):
+        """Return {alias: collection} for all aliases, cached for ALIAS_CACHE_TTL seconds."""
+        if self._aliases is None or time.monotonic() - self._aliases_loaded > ALIAS_CACHE_TTL:
+            response = self.client.get_aliases()
+            self._aliases = {a.alias_name: a.collection_name for a in response.aliases}
+            self._aliases_loaded = time.monotonic()
+        return self._aliases
+
+    def resolve_collection(self, name):
+        """Return the collection an alias points to, or `name` itself if it is not an alias."""
+        return self.get_aliases().get(name, name)
+
+    def is_plain_collection(self, name):
+        """True if `name` is a concrete collection rather than an alias."""
+        return name not in self.get_aliases() and self.collection_exists(name)
+
+    def swap_alias(self, alias, collection_name, replace_collection=False, retries=3):
+        """
+        Point `alias` at `collection_name` in one atomic alias update.
+
+        If `alias` is currently a concrete collection (not yet an alias), Qdrant cannot hold
+        both under one name, so the collection has to be deleted first. That is only done with
+        `replace_collection=True`; requests to `alias` fail until the alias exists, and the
+        alias creation is retried because the old collection is already gone by then.
+        """
+        from qdrant_client.models import (
+            CreateAlias, CreateAliasOperation, DeleteAlias, DeleteAliasOperation
+        )
+        self._aliases = None  # decide on fresh alias state
+        previous = self.resolve_collection(alias)
+        operations = []
+        replaced = False
+        if alias in self.get_aliases():
+            operations.append(DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=alias)))
+        elif self.collection_exists(alias):
+            if not replace_collection:
+                raise ValueError(f"'{alias}' is a collection, not an alias; replacing it with an alias deletes it")
+            self.client.delete_collection(collection_name=alias)
+            replaced = True
+        operations.append(CreateAliasOperation(create_alias=CreateAlias(collection_name=collection_name, alias_name=alias)))
+        attempt = 0
+        while True:
+            try:
+                self.client.update_collection_aliases(change_aliases_operations=operations)
+                break
+            except Exception:
+                attempt += 1
+                if not replaced or attempt >= retries:
+                    raise
+                time.sleep(attempt)
+        self._aliases = None
+        self._notify_write(previous, collection_name)
+
     def delete_collection(self, collection_name):
-        return self.client.delete_collection(collection_name=collection_name)
+        self._notify_write(collection_name)
+        result = self.client.delete_collection(collection_name=collection_name)
+        self._aliases = None  # Qdrant drops aliases of a deleted collection
+        return result
 
     def upsert_vectors(self, collection_name, points):
         # Upsert points into the specified collection using qdrant-client
@@ -30,6 +187,40 @@ class QdrantManager:
             ) for point in points
         ]
         self.client.upsert(collection_name=collection_name, points=qdrant_points)
+        self._notify_write(collection_name)
+
+    @staticmethod
+    def batch_vectors(vectors, sparse_vectors=None):
+        """The `vectors` argument upload_collection gets for a batch, see upsert_batch."""
+        if sparse_vectors is None:
+            return vectors
+        from qdrant_client.models import SparseVector
+        # Named-vector dicts must hold lists: the gRPC conversion silently drops ndarray values
+        rows = vectors.tolist() if hasattr(vectors, "tolist") else vectors
+        return [
+            {"": row, SPARSE_VECTOR_NAME: SparseVector(**sparse)} if sparse and sparse["indices"] else {"": row}
+            for row, sparse in zip(rows, sparse_vectors)
+        ]
+
+    def upsert_batch(self, collection_name, ids, vectors, payloads, sparse_vectors=None):
+        """
+        Upsert a batch given as parallel ids/payload lists and a 2-D float32 vector array.
+
+        qdrant-client converts the array with one `tolist()` call and then builds a
+        PointStruct per point, serialized as JSON over REST or as packed floats over
+        gRPC; the per-point cost stays (see bench_vector_path.py). `sparse_vectors`
+        is an optional parallel list of {"indices", "values"} dicts (or None) for
+        hybrid collections, paired with each dense row in a per-point dict.
+        """
+        self.client.upload_collection(
+            collection_name=collection_name,
+            vectors=self.batch_vectors(vectors, sparse_vectors),
+            payload=payloads,
+            ids=ids,
+            batch_size=max(1, len(ids)),
+            wait=True
+        )
+        self._notify_write(collection_name)
 
     def search(self, collection_name, query_vector, limit=10, score_threshold=0.5, filter=None):
         # Minimal implementation for end-to-end test
@@ -41,17 +232,42 @@ class QdrantManager:
             score_threshold=score_threshold,
             query_filter=filter  # Pass Qdrant filter as query_filter
         )
+        return [self._to_result(hit) for hit in search_result]
+
+    def hybrid_search(self, collection_name, query_vector, sparse_vector, limit=10, filter=None, prefetch_limit=None):
+        """
+        Dense and BM25 sparse search in one query, merged with reciprocal rank fusion.
+
+        Scores are RRF scores (rank based), not cosine similarities. Falls back to
+        dense search when the query has no sparse terms.
+        """
+        if not sparse_vector or not sparse_vector["indices"]:
+            return self.search(collection_name, query_vector, limit=limit, filter=filter)
+        from qdrant_client.models import Prefetch, SparseVector, FusionQuery, Fusion
+        prefetch_limit = max(limit, prefetch_limit or HYBRID_PREFETCH_LIMIT)
+        response = self.client.query_points(
+            collection_name=collection_name,
+            prefetch=[
+                Prefetch(query=query_vector, limit=prefetch_limit, filter=filter),
+                Prefetch(query=SparseVector(**sparse_vector), using=SPARSE_VECTOR_NAME, limit=prefetch_limit,
+                         filter=filter)
+            ],
+            query=FusionQuery(fusion=Fusion.RRF),
+            limit=limit,
+            with_payload=True
+        )
+        return [self._to_result(hit) for hit in response.points]
+
+    @staticmethod
+    def _to_result(hit):
         # Flatten payload to match API response model
-        results = []
-        for hit in search_result:
-            payload = hit.payload or {}
-            results.append({
-                "id": hit.id,
-                "score": hit.score,
-                "text": payload.get("text", ""),
-                "source_id": payload.get("source_id", ""),
-                "source_path": payload.get("source_path", ""),
-                "metadata": payload.get("metadata", {}),
-                "keywords": payload.get("keywords", []),
-            })
-        return results
\ No newline at end of file
+        payload = hit.payload or {}
+        return {
+            "id": hit.id,
+            "score": hit.score,
+            "text": payload.get("text", ""),
+            "source_id": payload.get("source_id", ""),
+            "source_path": payload.get("source_path", ""),
+            "metadata": payload.get("metadata", {}),
+            "keywords": payload.get("keywords", []),
+        }
\ No newline at end of file
@@ -0,0 +1,257 @@
+"""
+Collection export/import without re-embedding.
+
+A snapshot is a directory with:
+  manifest.json   collection parameters, embedding settings and export progress
+  vectors.npy     (count, dim) float32 matrix, memory-mappable with np.load(mmap_mode="r")
+  points.jsonl    one {"id", "payload"} object per line, in the same row order as vectors.npy;
+                  hybrid collections add the BM25 vector as "sparse": {"indices", "values"}
+
+Both directions work in fixed-size batches and persist their position after every
+batch, so memory use does not grow with collection size and an interrupted run
+resumes where it stopped.
+"""
+import json
+import logging
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from core.admission import ingestion_governor
+from storage.qdrant_manager import SPARSE_VECTOR_NAME
+
+logger = logging.getLogger("storage.snapshot")
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+VECTORS_FILE = "vectors.npy"
+POINTS_FILE = "points.jsonl"
+IMPORT_STATE_FILE = "import_state.json"
+
+
+def _read_json(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def read_manifest(snapshot_dir):
+    return _read_json(os.path.join(snapshot_dir, MANIFEST_FILE))
+
+
+def _dense_vector(vector):
+    # Hybrid collections return {"": dense, "bm25": sparse}
+    return vector[""] if isinstance(vector, dict) else vector
+
+
+def _point_line(record):
+    point = {"id": record.id, "payload": record.payload}
+    sparse = record.vector.get(SPARSE_VECTOR_NAME) if isinstance(record.vector, dict) else None
+    if sparse is not None:
+        point["sparse"] = {"indices": list(sparse.indices), "values": list(sparse.values)}
+    return point
+
+
+def export_collection(storage_manager, collection_name, snapshot_dir, settings=None, batch_size=256,
+                      restart=False, progress_callback=None):
+    """Stream `collection_name` into `snapshot_dir`, resuming an unfinished export unless `restart` is set."""
+    os.makedirs(snapshot_dir, exist_ok=True)
+    manifest_path = os.path.join(snapshot_dir, MANIFEST_FILE)
+    vectors_path = os.path.join(snapshot_dir, VECTORS_FILE)
+    points_path = os.path.join(snapshot_dir, POINTS_FILE)
+
+    manifest = None if restart else _read_json(manifest_path)
+    if manifest and manifest.get("collection") != collection_name:
+        raise ValueError(f"Snapshot directory already holds an export of '{manifest.get('collection')}'")
+    if manifest and manifest.get("complete"):
+        logger.info(f"Export of '{collection_name}' already complete at {snapshot_dir}")
+        return manifest
+
+    if manifest:
+        vectors = np.load(vectors_path, mmap_mode="r+")
+        logger.info(f"Resuming export of '{collection_name}' at row {manifest['exported']}")
+    else:
+        vector_size = storage_manager.get_vector_size(collection_name)
+        if vector_size is None:
+            raise ValueError(f"Collection '{collection_name}' uses named vectors, which export does not support")
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "collection": collection_name,
+            "vector_size": vector_size,
+            "distance": storage_manager.get_distance(collection_name),
+            "sparse_vectors": storage_manager.has_sparse_vectors(collection_name),
+            "settings": settings or {},
+            # Points added after this count are not exported; the file is preallocated to it
+            "count": storage_manager.count(collection_name),
+            "exported": 0,
+            "points_bytes": 0,
+            "next_offset": None,
+            "complete": False
+        }
+        vectors = np.lib.format.open_memmap(
+            vectors_path, mode="w+", dtype=np.float32, shape=(manifest["count"], vector_size)
+        )
+        open(points_path, "wb").close()
+        _write_json(manifest_path, manifest)
+
+    total = manifest["count"]
+    with open(points_path, "r+b") as points_file:
+        # Drop any lines written after the last saved position
+        points_file.truncate(manifest["points_bytes"])
+        points_file.seek(manifest["points_bytes"])
+        offset = manifest["next_offset"]
+        while manifest["exported"] < total:
+            records, next_offset = storage_manager.scroll(collection_name, limit=batch_size, offset=offset)
+            records = records[:total - manifest["exported"]]
+            if records:
+                start = manifest["exported"]
+                end = start + len(records)
+                vectors[start:end] = np.asarray([_dense_vector(record.vector) for record in records], dtype=np.float32)
+                lines = "".join(json.dumps(_point_line(record)) + "\n" for record in records)
+                points_file.write(lines.encode("utf-8"))
+                points_file.flush()
+                vectors.flush()
+                manifest["exported"] = end
+                manifest["points_bytes"] = points_file.tell()
+            manifest["next_offset"] = next_offset
+            offset = next_offset
+            _write_json(manifest_path, manifest)
+            if progress_callback:
+                progress_callback({"processed": manifest["exported"], "total": total,
+                                   "percent": round(100 * manifest["exported"] / total, 1) if total else 100})
+            if next_offset is None or not records:
+                break
+
+    # Points deleted during the export leave unused rows at the end; record the real count
+    manifest["count"] = manifest["exported"]
+    manifest["complete"] = True
+    _write_json(manifest_path, manifest)
+    del vectors
+    logger.info(f"Exported {manifest['exported']} points from '{collection_name}' to {snapshot_dir}")
+    return manifest
+
+
+def check_import_target(storage_manager, collection_name, manifest):
+    """Raise ValueError if an existing `collection_name` cannot hold the snapshot's points as exported."""
+    if not storage_manager.collection_exists(collection_name):
+        return
+    if storage_manager.get_vector_size(collection_name) != manifest["vector_size"]:
+        raise ValueError(f"Collection '{collection_name}' vector size does not match snapshot ({manifest['vector_size']})")
+    distance = manifest.get("distance")
+    target_distance = storage_manager.get_distance(collection_name)
+    if distance and str(target_distance).lower() != str(distance).lower():
+        raise ValueError(f"Collection '{collection_name}' distance {target_distance} does not match snapshot ({distance})")
+    # Dropping the snapshot's BM25 vectors (or importing points without them) would leave a hybrid collection
+    # with points search cannot match, or settings that point search and ingestion at a missing sparse vector
+    sparse = manifest.get("sparse_vectors", False)
+    if storage_manager.has_sparse_vectors(collection_name) != sparse:
+        raise ValueError(f"Collection '{collection_name}' {'has no' if sparse else 'has'} BM25 sparse vectors but the "
+                         f"snapshot {'does' if sparse else 'does not'}; import into a new collection instead")
+
+
+def imported_settings(manifest, target_settings=None):
+    """
+    Settings to store for the import target once the import succeeded. A target that already
+    has BM25 corpus counts keeps them: they describe the points it held before the import.
+    """
+    settings = dict(manifest.get("settings") or {})
+    settings["hybrid"] = manifest.get("sparse_vectors", False)
+    if (target_settings or {}).get("bm25_stats"):
+        settings["bm25_stats"] = target_settings["bm25_stats"]
+    return settings
+
+
+def import_collection(storage_manager, snapshot_dir, collection_name=None, batch_size=256, parallel=4,
+                      restart=False, progress_callback=None):
+    """
+    Bulk-load a snapshot into `collection_name` (default: the exported collection's name).
+
+    Batches are upserted by `parallel` worker threads with at most 2 * parallel batches in
+    flight. Progress is saved as the highest contiguous completed row, so a resumed
+    import never skips rows; repeated rows are harmless because upserts reuse point ids.
+    """
+    manifest = read_manifest(snapshot_dir)
+    if not manifest or not manifest.get("complete"):
+        raise ValueError(f"No complete export found in {snapshot_dir}")
+    collection_name = collection_name or manifest["collection"]
+    settings = manifest.get("settings") or {}
+    state_path = os.path.join(snapshot_dir, IMPORT_STATE_FILE)
+    state = None if restart else _read_json(state_path)
+    if not state or state.get("collection") != collection_name:
+        state = {"collection": collection_name, "imported": 0, "points_bytes": 0, "complete": False}
+    if state["complete"]:
+        logger.info(f"Import of {snapshot_dir} into '{collection_name}' already complete")
+        return state
+
+    check_import_target(storage_manager, collection_name, manifest)
+    if not storage_manager.collection_exists(collection_name):
+        storage_manager.create_collection(
+            collection_name=collection_name,
+            vector_size=manifest["vector_size"],
+            distance=manifest.get("distance") or "cosine",
+            binary_quantization=settings.get("embedding_type", "float") != "float",
+            sparse_vectors=manifest.get("sparse_vectors", False)
+        )
+
+    with_sparse = manifest.get("sparse_vectors", False)
+    total = manifest["count"]
+    vectors = np.load(os.path.join(snapshot_dir, VECTORS_FILE), mmap_mode="r")
+    in_flight = deque()
+
+    def upsert(ids, batch_vectors, payloads, sparse_vectors):
+        # Bulk loads yield Qdrant write capacity to live search like any other ingestion
+        with ingestion_governor.batch():
+            storage_manager.upsert_batch(collection_name, ids, batch_vectors, payloads, sparse_vectors=sparse_vectors)
+
+    def complete_oldest():
+        future, end, points_bytes = in_flight.popleft()
+        future.result()
+        state["imported"] = end
+        state["points_bytes"] = points_bytes
+        _write_json(state_path, state)
+        if progress_callback:
+            progress_callback({"processed": end, "total": total,
+                               "percent": round(100 * end / total, 1) if total else 100})
+
+    with open(os.path.join(snapshot_dir, POINTS_FILE), "rb") as points_file, \
+            ThreadPoolExecutor(max_workers=parallel) as executor:
+        points_file.seek(state["points_bytes"])
+        row = state["imported"]
+        while row < total:
+            ids, payloads, sparse_vectors = [], [], []
+            for _ in range(min(batch_size, total - row)):
+                line = points_file.readline()
+                if not line:
+                    break
+                point = json.loads(line)
+                ids.append(point["id"])
+                payloads.append(point["payload"])
+                sparse_vectors.append(point.get("sparse"))
+            if not ids:
+                break
+            end = row + len(ids)
+            batch_vectors = np.ascontiguousarray(vectors[row:end])
+            future = executor.submit(upsert, ids, batch_vectors, payloads,
+                                     sparse_vectors if with_sparse else None)
+            in_flight.append((future, end, points_file.tell()))
+            row = end
+            if len(in_flight) >= 2 * parallel:
+                complete_oldest()
+        while in_flight:
+            complete_oldest()
+
+    state["complete"] = True
+    _write_json(state_path, state)
+    del vectors
+    logger.info(f"Imported {state['imported']} points from {snapshot_dir} into '{collection_name}'")
+    return state